@@ -0,0 +1,199 @@
+import numpy as np
+
+
+def cluster_levels(levels, cluster_distance):
+    """
+    Merge sorted price levels whose neighbours are within cluster_distance and return each cluster's mean.
+
+    Clusters are split wherever the gap to the previous level exceeds the distance,
+    so a cluster can chain across several close levels, and all cluster means are
+    reduced in one segmented sum.
+    """
+    levels = np.sort(np.asarray(levels, dtype=np.float64))
+    if levels.size == 0:
+        return levels
+    starts = np.flatnonzero(np.r_[True, np.diff(levels) > cluster_distance])
+    counts = np.diff(np.r_[starts, levels.size])
+    return np.add.reduceat(levels, starts) / counts
+
+
+def _extrema(highs, lows, prominence):
+    # scipy.signal costs about a second to import; load it on first use so importing
+    # this module stays cheap for processes that never detect levels.
+    from scipy.signal import find_peaks
+
+    peak_indices, _ = find_peaks(highs, prominence=prominence)
+    trough_indices, _ = find_peaks(-lows, prominence=prominence)
+    return np.concatenate([highs[peak_indices], lows[trough_indices]])
+
+
+def _cluster_distance(highs, lows, cluster_distance_factor):
+    price_range = np.nanmax(highs) - np.nanmin(lows)
+    return price_range * cluster_distance_factor / 100
+
+
+def find_significant_levels(data, prominence=2, cluster_distance_factor=0.5):
+    """
+    Identify significant levels based on prominent highs and lows and combine clusters into single levels.
+    """
+    highs = np.asarray(data['High'], dtype=np.float64)
+    lows = np.asarray(data['Low'], dtype=np.float64)
+    if highs.size == 0:
+        return []
+    adjusted_cluster_distance = _cluster_distance(highs, lows, cluster_distance_factor)
+    all_levels = _extrema(highs, lows, prominence)
+    return cluster_levels(all_levels, adjusted_cluster_distance).tolist()
+
+
+class ProminenceIndex:
+    """
+    Every local high and low of a series with its prominence, for cheap level-detection sweeps.
+
+    The bars are scanned once: all local maxima of the highs and of the negated
+    lows are found and their prominences computed, then stored in descending
+    prominence order. levels(prominence, cluster_distance_factor) slices the
+    extrema at or above the threshold and reclusters them, giving the same levels
+    as find_significant_levels with those parameters without rescanning the bars.
+    """
+
+    def __init__(self, data):
+        # Same lazy import as _extrema.
+        from scipy.signal import find_peaks, peak_prominences
+
+        highs = np.asarray(data['High'], dtype=np.float64)
+        lows = np.asarray(data['Low'], dtype=np.float64)
+        self.price_range = float(np.nanmax(highs) - np.nanmin(lows)) if highs.size else 0.0
+        values, prominences = [], []
+        for series, sign in ((highs, 1.0), (-lows, -1.0)):
+            peaks, _ = find_peaks(series)
+            values.append(sign * series[peaks])
+            prominences.append(peak_prominences(series, peaks)[0])
+        values, prominences = np.concatenate(values), np.concatenate(prominences)
+        order = np.argsort(-prominences, kind='stable')
+        self.values = values[order]
+        self.prominences = prominences[order]
+
+    def __len__(self):
+        return self.values.size
+
+    def extrema(self, prominence):
+        """
+        Values of the extrema whose prominence is at least the given threshold.
+        """
+        count = np.searchsorted(-self.prominences, -prominence, side='right')
+        return self.values[:count]
+
+    def levels(self, prominence=2, cluster_distance_factor=0.5):
+        return cluster_levels(
+            self.extrema(prominence), self.price_range * cluster_distance_factor / 100
+        ).tolist()
+
+    def sweep(self, prominences, cluster_distance_factors):
+        """
+        Levels for every (prominence, cluster_distance_factor) pair of the grid, as a dict keyed by the pair.
+
+        Each prominence threshold is sliced and sorted once and then clustered at
+        every distance.
+        """
+        results = {}
+        for prominence in prominences:
+            selected = np.sort(self.extrema(prominence))
+            for factor in cluster_distance_factors:
+                results[(prominence, factor)] = cluster_levels(selected, self.price_range * factor / 100).tolist()
+        return results
+
+
+def find_significant_levels_batch(highs, lows, prominence=2, cluster_distance_factor=0.5):
+    """
+    Compute significant levels for many series at once.
+
+    highs and lows are sequences of 1-D arrays, one pair per ticker. Peak detection
+    runs per series, then the extrema of every series are sorted together by
+    (series, level) and clustered in a single segmented pass. Returns one list of
+    levels per series, in input order.
+    """
+    extrema, owners, distances = [], [], []
+    for owner, (series_highs, series_lows) in enumerate(zip(highs, lows)):
+        series_highs = np.asarray(series_highs, dtype=np.float64)
+        series_lows = np.asarray(series_lows, dtype=np.float64)
+        if series_highs.size == 0:
+            distances.append(0.0)
+            continue
+        levels = _extrema(series_highs, series_lows, prominence)
+        extrema.append(levels)
+        owners.append(np.full(levels.size, owner))
+        distances.append(_cluster_distance(series_highs, series_lows, cluster_distance_factor))
+
+    results = [[] for _ in distances]
+    if not extrema or sum(levels.size for levels in extrema) == 0:
+        return results
+
+    levels = np.concatenate(extrema)
+    owner = np.concatenate(owners)
+    order = np.lexsort((levels, owner))
+    levels, owner = levels[order], owner[order]
+
+    breaks = (np.diff(owner) != 0) | (np.diff(levels) > np.asarray(distances)[owner[1:]])
+    starts = np.flatnonzero(np.r_[True, breaks])
+    counts = np.diff(np.r_[starts, levels.size])
+    means = np.add.reduceat(levels, starts) / counts
+
+    cluster_owner = owner[starts]
+    boundaries = np.flatnonzero(np.diff(cluster_owner)) + 1
+    for series_owner, series_means in zip(cluster_owner[np.r_[0, boundaries]], np.split(means, boundaries)):
+        results[series_owner] = series_means.tolist()
+    return results
+
+
+def average_true_range(data, window=14):
+    """
+    Simple average of the true range over the last window bars.
+    """
+    highs = np.asarray(data['High'], dtype=np.float64)
+    lows = np.asarray(data['Low'], dtype=np.float64)
+    closes = np.asarray(data['Close'], dtype=np.float64)
+    prev_closes = np.r_[closes[0], closes[:-1]] if closes.size else closes
+    true_range = np.fmax(highs - lows, np.fmax(np.abs(highs - prev_closes), np.abs(lows - prev_closes)))
+    return float(np.nanmean(true_range[-window:])) if true_range.size else float('nan')
+
+
+def sorted_extremes(data):
+    """
+    All highs and lows of a timeframe in one sorted array, ready for binary search.
+    """
+    values = np.concatenate([np.asarray(data['High'], dtype=np.float64), np.asarray(data['Low'], dtype=np.float64)])
+    return np.sort(values[~np.isnan(values)])
+
+
+def levels_touched(levels, extremes, tolerance):
+    """
+    For each level, whether any value in the sorted extremes lies strictly within tolerance of it.
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    if extremes.size == 0:
+        return np.zeros(levels.size, dtype=bool)
+    first_above = np.searchsorted(extremes, levels - tolerance, side='right')
+    nearest_above = extremes[np.minimum(first_above, extremes.size - 1)]
+    return (first_above < extremes.size) & (nearest_above < levels + tolerance)
+
+
+def filter_levels(levels, frames, tolerance=0.5, atr_multiple=None, atr_window=14):
+    """
+    Keep the levels that a high or low touches on every one of the given timeframes.
+
+    The tolerance is absolute by default; pass atr_multiple to use atr_multiple times
+    each timeframe's ATR instead.
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    keep = np.ones(levels.size, dtype=bool)
+    for data in frames:
+        frame_tolerance = tolerance if atr_multiple is None else atr_multiple * average_true_range(data, atr_window)
+        keep &= levels_touched(levels, sorted_extremes(data), frame_tolerance)
+    return levels[keep].tolist()
+
+
+def analyze_and_filter_levels(data_1m, levels_1m, data_5m, data_15m, data_1h, tolerance=0.5, atr_multiple=None):
+    """
+    Analyze the 1-minute places of interest on the 5-minute, 15-minute, and 1-hour charts and filter out those that do not align.
+    """
+    return filter_levels(levels_1m, [data_5m, data_15m, data_1h], tolerance=tolerance, atr_multiple=atr_multiple)
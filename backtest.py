@@ -0,0 +1,248 @@
+"""
+Walk-forward backtest of significant levels as support and resistance.
+
+Levels are found on a training window of sessions and scored on the sessions
+that follow it, then the windows roll forward. A touch is a run of consecutive
+bars whose high-low range, widened by the tolerance, contains the level. The
+close before the run gives the side the price came from. The first bar after
+the run lies wholly above or below the band: on the same side is a bounce, on
+the other side a break. A run that is still going when the window ends is
+unresolved. Time to touch is the number of bars from the start of the test
+window to a level's first touch.
+
+    python backtest.py --tickers AAPL MSFT --start 2023-01-01 --end 2024-07-01 \
+        --train-days 5 --test-days 1 --workers 8 --output backtest.csv
+"""
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analysis import average_true_range, find_significant_levels
+from datastore import fetch_many
+from screen import FETCH_BATCH, FETCH_WORKERS, get_process_pool, read_tickers
+from timeframes import session_bars
+
+LEVEL_COLUMNS = (
+    "ticker", "train_start", "test_start", "test_end", "level", "tolerance",
+    "touches", "support_touches", "resistance_touches", "bounces", "breaks", "unresolved", "bars_to_touch",
+)
+
+
+def touch_statistics(levels, opens, highs, lows, closes, tolerance, lead=0):
+    """
+    Touch, bounce and break counts for every level over a run of bars, in one vectorized pass.
+
+    Bars before index lead only provide context: the side a touch starting at
+    lead comes from. Touches that start inside the lead bars are ignored.
+    Returns a dict of per-level arrays in the order of levels: touches,
+    support_touches, resistance_touches, bounces, breaks, unresolved and
+    bars_to_touch (counted from bar lead, NaN if never touched).
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    order = np.argsort(levels)
+    sorted_levels = levels[order]
+    n, k = len(highs), levels.size
+    stats = {name: np.zeros(k, dtype=np.int64) for name in (
+        "touches", "support_touches", "resistance_touches", "bounces", "breaks", "unresolved"
+    )}
+    stats["bars_to_touch"] = np.full(k, np.nan)
+    if n == 0 or k == 0:
+        return stats
+
+    # Each bar touches the contiguous run of sorted levels inside [low - tol, high + tol].
+    first = np.searchsorted(sorted_levels, lows - tolerance, side='left')
+    last = np.searchsorted(sorted_levels, highs + tolerance, side='right')
+    counts = np.where(np.isnan(highs) | np.isnan(lows), 0, np.maximum(last - first, 0))
+    if counts.sum() == 0:
+        return stats
+    bar = np.repeat(np.arange(n), counts)
+    offsets = np.cumsum(counts) - counts
+    level = first[bar] + np.arange(bar.size) - offsets[bar]
+
+    # Events sorted by (level, bar); a touch starts wherever the run of bars breaks.
+    event_order = np.lexsort((bar, level))
+    bar, level = bar[event_order], level[event_order]
+    starts = np.r_[True, (np.diff(level) != 0) | (np.diff(bar) != 1)]
+    ends = np.r_[starts[1:], True]
+    start_bar, touch_level = bar[starts], level[starts]
+    end_bar = bar[ends]
+    keep = start_bar >= lead
+    start_bar, end_bar, touch_level = start_bar[keep], end_bar[keep], touch_level[keep]
+    values = sorted_levels[touch_level]
+
+    # Side the price came from: the previous close, or the open when the first bar touches.
+    before = np.where(start_bar > 0, closes[np.maximum(start_bar - 1, 0)], opens[start_bar])
+    from_above = before > values
+    after = np.minimum(end_bar + 1, n - 1)
+    resolved = end_bar + 1 < n
+    above_after = resolved & (lows[after] > values + tolerance)
+    below_after = resolved & (highs[after] < values - tolerance)
+    bounce = (from_above & above_after) | (~from_above & below_after)
+    broke = (from_above & below_after) | (~from_above & above_after)
+
+    def per_level(mask):
+        return np.bincount(touch_level[mask], minlength=k)[np.argsort(order)]
+
+    everything = np.ones(touch_level.size, dtype=bool)
+    stats.update({
+        "touches": per_level(everything),
+        "support_touches": per_level(from_above),
+        "resistance_touches": per_level(~from_above),
+        "bounces": per_level(bounce),
+        "breaks": per_level(broke),
+        "unresolved": per_level(~resolved),
+    })
+    # Events are sorted by bar within each level, so the first touch of a level comes first.
+    touched, first_touch = np.unique(touch_level, return_index=True)
+    bars_to_touch = np.full(k, np.nan)
+    bars_to_touch[order[touched]] = start_bar[first_touch] - lead
+    stats["bars_to_touch"] = bars_to_touch
+    return stats
+
+
+def walk_forward_windows(index, train_days=5, test_days=1):
+    """
+    (train_start, test_start, test_end) bar positions for rolling windows of whole sessions.
+
+    index must be sorted. Each test window follows its training window and the
+    next training window ends where that test window ends.
+    """
+    days = index.normalize().asi8
+    boundaries = np.r_[np.flatnonzero(np.r_[True, days[1:] != days[:-1]]), len(days)] if len(days) else np.r_[0]
+    sessions = len(boundaries) - 1
+    return [
+        (int(boundaries[day - train_days]), int(boundaries[day]), int(boundaries[min(day + test_days, sessions)]))
+        for day in range(train_days, sessions, test_days)
+    ]
+
+
+def backtest_ticker(ticker, data_1m, train_days=5, test_days=1, tolerance=0.5, atr_multiple=None,
+                    prominence=2, cluster_distance_factor=0.5):
+    """
+    Walk-forward level statistics for one ticker, one row per (window, level).
+
+    Levels come from find_significant_levels on each training window. The
+    tolerance is absolute unless atr_multiple is given, in which case it is
+    atr_multiple times the ATR over the training window's last bars.
+    """
+    data = session_bars(data_1m) if len(data_1m) else data_1m
+    if data.empty:
+        return pd.DataFrame(columns=LEVEL_COLUMNS)
+    bars = {column: data[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close")}
+    windows = walk_forward_windows(data.index, train_days, test_days)
+    columns = {name: [] for name in LEVEL_COLUMNS[1:]}
+    for train_start, test_start, test_end in windows:
+        train = {column: values[train_start:test_start] for column, values in bars.items()}
+        levels = find_significant_levels(train, prominence, cluster_distance_factor)
+        window_tolerance = tolerance if atr_multiple is None else atr_multiple * average_true_range(train)
+        # Include the last training bar so a touch on the first test bar has a prior close.
+        lead = test_start - 1
+        stats = touch_statistics(
+            levels, *(bars[column][lead:test_end] for column in ("Open", "High", "Low", "Close")),
+            window_tolerance, lead=1,
+        )
+        count = len(levels)
+        for name, position in (("train_start", train_start), ("test_start", test_start), ("test_end", test_end - 1)):
+            columns[name].append(np.full(count, position))
+        columns["level"].append(np.asarray(levels, dtype=np.float64))
+        columns["tolerance"].append(np.full(count, window_tolerance))
+        for name in LEVEL_COLUMNS[6:]:
+            columns[name].append(stats[name])
+
+    results = pd.DataFrame({
+        name: np.concatenate(values) if values else np.array([], dtype=np.int64) for name, values in columns.items()
+    })
+    for name in ("train_start", "test_start", "test_end"):
+        results[name] = data.index[results[name].to_numpy()]
+    results.insert(0, "ticker", ticker)
+    return results
+
+
+def summarize(results):
+    """
+    Per-ticker totals and rates from backtest_ticker rows.
+
+    bounce_rate and break_rate are shares of resolved touches, hit_rate the
+    share of levels touched at least once in their test window, and
+    median_bars_to_touch is over the touched levels.
+    """
+    grouped = results.groupby("ticker", sort=False)
+    summary = pd.DataFrame({
+        "windows": grouped["test_start"].nunique(),
+        "levels": grouped.size(),
+        "touches": grouped["touches"].sum(),
+        "bounces": grouped["bounces"].sum(),
+        "breaks": grouped["breaks"].sum(),
+        "unresolved": grouped["unresolved"].sum(),
+        "hit_rate": grouped["touches"].apply(lambda touches: float((touches > 0).mean())),
+        "median_bars_to_touch": grouped["bars_to_touch"].median(),
+    })
+    resolved = (summary["bounces"] + summary["breaks"]).replace(0, np.nan)
+    summary["bounce_rate"] = summary["bounces"] / resolved
+    summary["break_rate"] = summary["breaks"] / resolved
+    return summary
+
+
+def backtest_universe(tickers, start_date, end_date, workers=None, pool=None, **params):
+    """
+    Backtest many tickers, fetching in bulk batches and scoring each ticker on the process pool.
+
+    params are passed to backtest_ticker. Returns the per-level rows of every
+    ticker in input order.
+    """
+    tickers = list(tickers)
+    pool = pool or get_process_pool(workers)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetch_pool:
+        batches = [
+            fetch_pool.submit(fetch_many, tickers[i:i + FETCH_BATCH], start_date, end_date, "1m")
+            for i in range(0, len(tickers), FETCH_BATCH)
+        ]
+        runs = {}
+        for future in as_completed(batches):
+            for ticker, data_1m in future.result().items():
+                runs[ticker] = pool.submit(backtest_ticker, ticker, data_1m, **params)
+        results = [runs[ticker].result() for ticker in tickers if ticker in runs]
+    if not results:
+        return pd.DataFrame(columns=LEVEL_COLUMNS)
+    return pd.concat(results, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of significant levels.")
+    parser.add_argument("--tickers", nargs="*", help="ticker symbols")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--train-days", type=int, default=5, help="sessions used to find levels")
+    parser.add_argument("--test-days", type=int, default=1, help="sessions the levels are scored on")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--atr-multiple", type=float, default=None)
+    parser.add_argument("--prominence", type=float, default=2)
+    parser.add_argument("--cluster-distance-factor", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--output", help="write the per-level rows as .csv or .json")
+    args = parser.parse_args(argv)
+
+    tickers = read_tickers(args)
+    if not tickers:
+        parser.error("no tickers given")
+    results = backtest_universe(
+        tickers, args.start, args.end, workers=args.workers,
+        train_days=args.train_days, test_days=args.test_days, tolerance=args.tolerance,
+        atr_multiple=args.atr_multiple, prominence=args.prominence,
+        cluster_distance_factor=args.cluster_distance_factor,
+    )
+    if args.output and args.output.endswith(".json"):
+        results.to_json(args.output, orient="records", date_format="iso", indent=2)
+    elif args.output:
+        results.to_csv(args.output, index=False)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summarize(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Compact array-backed OHLCV bars for long intraday histories.
+
+A DataFrame of float64 OHLCV bars with a DatetimeIndex costs 48 bytes per bar
+before pandas overhead. Bars keeps int64 epoch nanoseconds plus float32 price
+and volume columns in contiguous arrays, 28 bytes per bar. It supports the
+column lookups that analysis.find_significant_levels, analysis.filter_levels and
+trend.determine_trend use (bars['High'] and so on), so those accept it directly.
+float32 holds about seven significant digits, so levels computed from Bars can
+differ from float64 results in the last cents of four-digit prices.
+"""
+import numpy as np
+import pandas as pd
+
+from providers import normalize_bars
+
+PRICE_DTYPE = np.float32
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+class Bars:
+    """
+    OHLCV bars as parallel arrays: time (int64 UTC epoch nanoseconds) and float32 columns.
+
+    Indexing with a column name returns that column's array; indexing with a
+    slice or integer array returns a new Bars over the selected rows (a view
+    for slices).
+    """
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume", "tz")
+
+    def __init__(self, time, open, high, low, close, volume=None, tz=None):
+        self.time = np.ascontiguousarray(time, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=PRICE_DTYPE)
+        self.high = np.ascontiguousarray(high, dtype=PRICE_DTYPE)
+        self.low = np.ascontiguousarray(low, dtype=PRICE_DTYPE)
+        self.close = np.ascontiguousarray(close, dtype=PRICE_DTYPE)
+        self.volume = np.ascontiguousarray(
+            np.zeros(self.time.size) if volume is None else volume, dtype=PRICE_DTYPE
+        )
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, data):
+        """
+        Convert a bar DataFrame, including yfinance's MultiIndex column layout.
+        """
+        data = normalize_bars(data)
+        index = data.index
+        tz = str(index.tz) if getattr(index, "tz", None) is not None else None
+        if tz:
+            index = index.tz_convert("UTC").tz_localize(None)
+        return cls(
+            index.as_unit("ns").asi8,
+            *(data[column].to_numpy() if column in data else None for column in COLUMNS),
+            tz=tz,
+        )
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {column: self[column] for column in COLUMNS},
+            index=self.index,
+        )
+
+    @property
+    def index(self):
+        index = pd.DatetimeIndex(self.time.view("M8[ns]"))
+        return index.tz_localize("UTC").tz_convert(self.tz) if self.tz else index
+
+    @property
+    def empty(self):
+        return self.time.size == 0
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ("time", "open", "high", "low", "close", "volume"))
+
+    def __len__(self):
+        return self.time.size
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in COLUMNS:
+                raise KeyError(key)
+            return getattr(self, key.lower())
+        return Bars(
+            self.time[key], self.open[key], self.high[key], self.low[key], self.close[key], self.volume[key],
+            tz=self.tz,
+        )
+
+    def __contains__(self, column):
+        return column in COLUMNS
+
+    def __repr__(self):
+        return f"Bars({len(self)} bars, tz={self.tz!r}, {self.nbytes} bytes)"
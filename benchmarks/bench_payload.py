@@ -0,0 +1,72 @@
+"""
+Compare the Plotly JSON /plot/ payload with the packed columnar /plot/binary/ payload.
+
+Both paths run the same analysis on synthetic bars; the timings cover building
+and serializing the response body, and the sizes are the bytes sent to the client.
+
+    python benchmarks/bench_payload.py --days 5 --chart-width 4000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from benchmarks.synthetic import synthetic_bars
+from columnar import pack_series
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--chart-width", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start_date = "2024-07-01"
+    end_date = str((pd.Timestamp(start_date) + pd.offsets.BDay(args.days)).date())
+    data_1m = synthetic_bars("BENCH", start_date, end_date, "1m")
+    data_sector = synthetic_bars("SECTOR", "2023-01-01", end_date, "1d")
+    data_index = synthetic_bars("INDEX", "2023-01-01", end_date, "1d")
+    result = main.run_analysis(data_1m, data_sector, data_index, args.chart_width)
+
+    def json_path():
+        content = main.build_plot_payload("BENCH", data_1m, data_sector, data_index, args.chart_width)
+        return json.dumps(content).encode()
+
+    def binary_path():
+        return main.build_binary_payload("BENCH", data_1m, data_sector, data_index, args.chart_width)
+
+    def binary_encode_only():
+        header = {"significant_levels": result["significant_levels"], "valid_levels": result["valid_levels"]}
+        return pack_series(header, list(result["charts"].items()))
+
+    candles = sum(len(frame) for frame in result["charts"].values())
+    print(f"{len(data_1m)} 1m bars, {candles} candles drawn across 4 charts")
+    json_time, json_body = best_of(args.repeat, json_path)
+    binary_time, binary_body = best_of(args.repeat, binary_path)
+    analysis_time, _ = best_of(args.repeat, lambda: main.run_analysis(data_1m, data_sector, data_index, args.chart_width))
+    pack_time, _ = best_of(args.repeat, binary_encode_only)
+    print(f"{'path':<10} {'total ms':>10} {'encode ms':>10} {'bytes':>12}")
+    print(f"{'json':<10} {json_time * 1000:10.1f} {(json_time - analysis_time) * 1000:10.1f} {len(json_body):12d}")
+    print(f"{'binary':<10} {binary_time * 1000:10.1f} {pack_time * 1000:10.1f} {len(binary_body):12d}")
+    print(f"binary is {len(json_body) / len(binary_body):.1f}x smaller and encodes "
+          f"{(json_time - analysis_time) / pack_time:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main_cli()
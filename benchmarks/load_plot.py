@@ -0,0 +1,89 @@
+"""
+Load test for the /plot/ endpoint against a local stub provider.
+
+Every request uses fresh tickers so each one misses the bar cache and pays the
+stub's simulated network latency. The run is repeated with the fetches forced
+back onto the event loop one after another, which is how the endpoint used to
+behave, so the throughput gain of concurrent fetching is visible side by side.
+
+    python benchmarks/load_plot.py --requests 40 --concurrency 8 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TA_CACHE_DIR", tempfile.mkdtemp(prefix="ta-load-"))
+
+import httpx
+
+import datastore
+import main
+from benchmarks.synthetic import SyntheticProvider
+
+
+async def sequential_fetch_all(requests, start_date, end_date):
+    # The pre-concurrency behaviour: blocking calls made one by one on the event loop.
+    return [datastore.fetch_data(ticker, start_date, end_date, interval) for ticker, interval in requests]
+
+
+async def run_load(num_requests, concurrency, tag):
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            form = {
+                "stock_ticker": f"{tag}S{i}",
+                "sector_ticker": f"{tag}X{i}",
+                "index_ticker": f"{tag}I{i}",
+                "start_date": "2024-07-22",
+                "end_date": "2024-07-23",
+            }
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/plot/", data=form)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(num_requests)])
+        elapsed = time.perf_counter() - started
+    return elapsed, np.array(latencies)
+
+
+def report(label, num_requests, elapsed, latencies):
+    print(
+        f"{label:<12} {num_requests / elapsed:8.2f} req/s   "
+        f"p50 {np.percentile(latencies, 50) * 1000:8.1f} ms   "
+        f"p95 {np.percentile(latencies, 95) * 1000:8.1f} ms"
+    )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated seconds per provider call")
+    args = parser.parse_args()
+
+    datastore.set_default_provider(SyntheticProvider(latency=args.latency))
+
+    concurrent_fetch_all = main.fetch_all
+    main.fetch_all = sequential_fetch_all
+    elapsed, latencies = asyncio.run(run_load(args.requests, args.concurrency, "SEQ"))
+    report("sequential", args.requests, elapsed, latencies)
+
+    main.fetch_all = concurrent_fetch_all
+    elapsed, latencies = asyncio.run(run_load(args.requests, args.concurrency, "CON"))
+    report("concurrent", args.requests, elapsed, latencies)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,232 @@
+"""
+Benchmark suite for the analysis hot paths on seeded synthetic bars.
+
+Each case is timed several times and the min/median are written to a JSON file
+named after the current commit, so runs can be compared across commits. Cold
+import times of the web app, the CLIs and the core modules are measured in
+fresh interpreters, and the memory held by each history size as DataFrames and
+as compact Bars is recorded alongside, as is the number of levels each size yields.
+
+    python benchmarks/run.py                        # all sizes, writes benchmarks/results/<commit>.json
+    python benchmarks/run.py --sizes 1d 1w --repeat 3
+    python benchmarks/run.py --compare benchmarks/results/abc123.json benchmarks/results/def456.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TA_CACHE_DIR", tempfile.mkdtemp(prefix="ta-bench-"))
+
+from fastapi.testclient import TestClient
+
+import datastore
+import main
+from analysis import ProminenceIndex, analyze_and_filter_levels, find_significant_levels
+from backtest import backtest_ticker
+from bars import Bars
+from chunked import ChunkedAnalysis
+from benchmarks.synthetic import PROMINENCES, SIZES, SyntheticProvider, synthetic_bars, synthetic_frames
+from trend import determine_trend
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Figure building and the endpoint draw at most a chart's worth of candles, so the
+# largest histories only add analysis time there; keep those cases to sane sizes.
+CHART_SIZES = ("1d", "1w", "1mo")
+# Parameter grid for the level-detection sweep cases.
+SWEEP_PROMINENCES = (0.5, 1, 2, 3, 5)
+SWEEP_CLUSTER_FACTORS = (0.25, 0.5, 1)
+# Modules whose cold import time is tracked: the web app, the CLIs and the shared core.
+IMPORT_MODULES = ("analysis", "datastore", "main", "screen", "technicalanalysis")
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {"min": min(timings), "median": statistics.median(timings), "runs": repeat}
+
+
+def measure_import(module, repeat):
+    """
+    Time importing module in fresh interpreters; the child reports the import alone,
+    excluding interpreter start-up.
+    """
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    timings = [
+        float(subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.split()[-1])
+        for _ in range(repeat)
+    ]
+    return {"min": min(timings), "median": statistics.median(timings), "runs": repeat}
+
+
+def cases(size):
+    """
+    Yield (name, callable) pairs for one history size.
+    """
+    frames = synthetic_frames(size)
+    data_1m, data_5m, data_15m, data_1h = frames["1m"], frames["5m"], frames["15m"], frames["1h"]
+    end_date = str(data_1m.index[-1].date() + timedelta(days=1))
+    start_date = str(data_1m.index[0].date())
+    daily = synthetic_bars("SECTOR", "2023-01-02", end_date, "1d")
+    prominence = PROMINENCES[size]
+    levels = find_significant_levels(data_1m, prominence)
+
+    for interval, data in frames.items():
+        yield f"find_significant_levels[{interval}]", lambda data=data: find_significant_levels(data, prominence)
+    yield "level_sweep[1m,rerun]", lambda: [
+        find_significant_levels(data_1m, prominence, factor)
+        for prominence in SWEEP_PROMINENCES for factor in SWEEP_CLUSTER_FACTORS
+    ]
+    yield "level_sweep[1m,ProminenceIndex]", lambda: ProminenceIndex(data_1m).sweep(
+        SWEEP_PROMINENCES, SWEEP_CLUSTER_FACTORS)
+    yield "analyze_and_filter_levels", lambda: analyze_and_filter_levels(data_1m, levels, data_5m, data_15m, data_1h)
+    for interval, data in frames.items():
+        yield f"determine_trend[{interval}]", lambda data=data: determine_trend(data)
+    yield "backtest_ticker[1m]", lambda: backtest_ticker("BENCH", data_1m)
+
+    def chunked_analysis(chunks=[part for _, part in data_1m.groupby(data_1m.index.date)]):
+        analysis = ChunkedAnalysis(prominence=prominence)
+        for chunk in chunks:
+            analysis.add(chunk)
+        return analysis.result()
+
+    yield "chunked_analysis[1m,daily chunks]", chunked_analysis
+
+    bars = {interval: Bars.from_frame(data) for interval, data in frames.items()}
+    yield "find_significant_levels[1m,Bars]", lambda: find_significant_levels(bars["1m"], prominence)
+    yield "analyze_and_filter_levels[Bars]", lambda: analyze_and_filter_levels(
+        bars["1m"], levels, bars["5m"], bars["15m"], bars["1h"])
+    yield "determine_trend[1h,Bars]", lambda: determine_trend(bars["1h"])
+
+    if size not in CHART_SIZES:
+        return
+    result = main.run_analysis(data_1m, daily, daily)
+    figures = main.build_figures("BENCH", result)
+    yield "figure_construction", lambda: main.build_figures("BENCH", result)
+    yield "json_encoding", lambda: [main.to_json(fig) for fig in figures]
+
+    datastore.set_default_provider(SyntheticProvider())
+    client = TestClient(main.app)
+    form = {
+        "stock_ticker": "BENCH", "sector_ticker": "SECTOR", "index_ticker": "INDEX",
+        "start_date": start_date, "end_date": end_date,
+    }
+    client.post("/plot/", data=form)  # warm the bar cache
+
+    def endpoint():
+        main.result_cache.clear()
+        response = client.post("/plot/", data=form)
+        response.raise_for_status()
+
+    yield "plot_endpoint", endpoint
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def memory_usage(size):
+    """
+    Bytes held by each timeframe's bars as a DataFrame and as a Bars container.
+    """
+    usage = {}
+    for interval, data in synthetic_frames(size).items():
+        usage[interval] = {
+            "dataframe": int(data.memory_usage(deep=True).sum()),
+            "bars": Bars.from_frame(data).nbytes,
+        }
+    return usage
+
+
+def report(key, result):
+    print(f"{key:<45} min {result['min'] * 1000:10.2f} ms   median {result['median'] * 1000:10.2f} ms")
+
+
+def run(sizes, repeat):
+    results, memory, levels = {}, {}, {}
+    for module in IMPORT_MODULES:
+        key = f"import[{module}]"
+        results[key] = measure_import(module, repeat)
+        report(key, results[key])
+    for size in sizes:
+        levels[size] = len(find_significant_levels(synthetic_frames(size)["1m"], PROMINENCES[size]))
+        print(f"{f'levels@{size}':<45} {levels[size]} at prominence {PROMINENCES[size]}")
+        for name, func in cases(size):
+            key = f"{name}@{size}"
+            func()  # warm-up
+            results[key] = measure(func, repeat)
+            report(key, results[key])
+        memory[size] = memory_usage(size)
+        for interval, usage in memory[size].items():
+            saved = 1 - usage["bars"] / usage["dataframe"]
+            print(f"{f'memory[{interval}]@{size}':<45} DataFrame {usage['dataframe'] / 1e6:8.2f} MB   "
+                  f"Bars {usage['bars'] / 1e6:8.2f} MB   saved {saved:.0%}")
+    return results, memory, levels
+
+
+def compare(base_path, head_path, threshold):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    regressions = 0
+    print(f"{'case':<45} {base['commit']:>10} {head['commit']:>10} {'ratio':>7}")
+    for key in sorted(set(base["results"]) & set(head["results"])):
+        before, after = base["results"][key]["min"], head["results"][key]["min"]
+        ratio = after / before if before else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{key:<45} {before * 1000:8.2f}ms {after * 1000:8.2f}ms {ratio:7.2f}{flag}")
+    return 1 if regressions else 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="*", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two results files")
+    parser.add_argument("--threshold", type=float, default=1.10, help="ratio flagged as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    commit = current_commit()
+    results, memory, levels = run(args.sizes, args.repeat)
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+            "memory": memory,
+            "levels": levels,
+        }, f, indent=2)
+    print(f"wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,96 @@
+"""
+Seeded synthetic OHLCV bars for offline benchmarks.
+"""
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from providers import Provider
+from timeframes import resample_bars
+
+SESSION_OPEN_MINUTE = 9 * 60 + 30
+SESSION_CLOSE_MINUTE = 16 * 60
+# Log-return volatility per bar: about 2% a day, like a liquid large-cap tech stock.
+MINUTE_STEP = 0.001
+DAILY_STEP = 0.02
+# Stationary spread of the log price; mean reversion keeps multi-year ranges bounded.
+PRICE_SPREAD = 0.15
+
+
+def _seed(ticker, seed):
+    return zlib.crc32(ticker.encode()) ^ seed
+
+
+def synthetic_bars(ticker, start_date, end_date, interval="1m", seed=0, start_price=250.0):
+    """
+    Mean-reverting random-walk OHLCV bars on regular-session weekdays, deterministic per (ticker, seed).
+    """
+    daily = interval == "1d"
+    index = pd.date_range(
+        start_date, end_date, freq="1D" if daily else "1min", inclusive="left",
+        tz=None if daily else "America/New_York",
+    )
+    index = index[index.dayofweek < 5]
+    if not daily:
+        minutes = index.hour * 60 + index.minute
+        index = index[(minutes >= SESSION_OPEN_MINUTE) & (minutes < SESSION_CLOSE_MINUTE)]
+
+    rng = np.random.default_rng(_seed(ticker, seed))
+    count = len(index)
+    step = DAILY_STEP if daily else MINUTE_STEP
+    decay = 1 - step ** 2 / (2 * PRICE_SPREAD ** 2)
+    close = start_price * np.exp(lfilter([1.0], [1.0, -decay], rng.normal(0, step, count)))
+    open_ = np.r_[start_price, close[:-1]]
+    wick = np.abs(rng.normal(0, step * start_price, count))
+    bars = pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) + wick,
+            "Low": np.minimum(open_, close) - wick,
+            "Close": close,
+            "Volume": rng.integers(100, 10_000, count).astype(np.float64),
+        },
+        index=index,
+    )
+    if interval in ("1m", "1d"):
+        return bars
+
+    return resample_bars(bars, (interval,))[interval]
+
+
+SIZES = {"1d": 1, "1w": 5, "1mo": 21, "1y": 252, "3y": 756}
+# Level prominence per size, so each size yields tens of levels. With the default of 2,
+# the extrema of a year or more are dense enough to chain into a few clusters.
+PROMINENCES = {"1d": 2, "1w": 2, "1mo": 2, "1y": 5, "3y": 10}
+
+
+def synthetic_frames(size="1w", ticker="BENCH", seed=0, end_date="2024-07-26"):
+    """
+    1m bars covering the given number of trading days plus the 5m/15m/1h frames derived from them.
+    """
+    end = pd.Timestamp(end_date)
+    start = end - pd.offsets.BDay(SIZES[size])
+    data_1m = synthetic_bars(ticker, start, end, "1m", seed=seed)
+    frames = resample_bars(data_1m, ("5m", "15m", "1h"))
+    frames["1m"] = data_1m
+    return frames
+
+
+class SyntheticProvider(Provider):
+    """
+    Provider serving synthetic_bars, optionally after a fixed simulated latency.
+    """
+
+    def __init__(self, latency=0.0, seed=0, rate_limit=None):
+        super().__init__(rate_limit)
+        self.latency = latency
+        self.seed = seed
+
+    def fetch(self, ticker, start_date, end_date, interval):
+        self.throttle()
+        if self.latency:
+            time.sleep(self.latency)
+        return synthetic_bars(ticker, start_date, end_date, interval, seed=self.seed)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+
+
+def payload_size(value):
+    """
+    Rough byte size of a JSON-like payload; strings dominate the chart responses.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k)) + payload_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_size(v) for v in value)
+    return 8
+
+
+def range_includes_today(start_date, end_date):
+    today = date.today()
+    return pd.Timestamp(start_date).date() <= today < pd.Timestamp(end_date).date()
+
+
+class ResultCache:
+    """
+    In-process response cache with per-entry TTL, byte-bounded LRU eviction and single-flight coalescing.
+
+    Concurrent callers asking for a key that is already being computed await the
+    same task instead of starting a second computation.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, size_of=payload_size):
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key, value, ttl):
+        size = self.size_of(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    async def get_or_compute(self, key, compute, ttl):
+        """
+        Return the cached value for key, or await compute() once for all concurrent callers.
+
+        The computation runs as its own task, so a caller that is cancelled (a
+        client disconnecting) stops waiting without cancelling it for the others.
+        A None result (no data) is shared with the concurrent callers but not
+        stored, so the next request retries upstream.
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, compute, ttl))
+            # Mark the exception as retrieved so a failure nobody is waiting for does not log a warning.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute, ttl):
+        try:
+            value = await compute()
+            if value is not None:
+                self.put(key, value, ttl)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,206 @@
+"""
+Out-of-core level and trend analysis for multi-year 1-minute histories.
+
+Bars are read in date-partitioned chunks from the bar store (filling gaps from
+the provider as usual), and each chunk is folded into a ChunkedAnalysis and
+then dropped. Memory is the chunk size plus the carried state:
+- tracker.LevelTracker's confirmed extrema and its peak and trough candidate
+  stacks. These grow with the number of extrema and of unbroken highs and
+  lows in the history, not with its bars.
+- the highs and lows of each confirmation timeframe that can still decide a
+  touch. With an absolute tolerance a value is dropped once its neighbours
+  are closer than the touch band is wide, which leaves at most about
+  2 * price range / tolerance values. With atr_multiple the tolerance is only
+  known at the end, so every distinct high and low is kept.
+- the last few bars per timeframe needed for ATR and trends
+
+Significant levels come from LevelTracker, which confirms each extremum
+exactly as scipy's find_peaks would on the whole series. No chunk overlap is
+needed, and no extremum is missed at a boundary. Chunks hold whole sessions, so
+the session-anchored 5m/15m/1h buckets never straddle two chunks. The results
+equal technicalanalysis.analyze on the full frame, bars with a NaN high, low or
+close included.
+
+    python chunked.py --ticker AAPL --start 2020-01-01 --end 2024-07-01 --chunk-days 20
+"""
+import argparse
+import json
+import math
+import sys
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from analysis import average_true_range, levels_touched, sorted_extremes
+from datastore import fetch_data
+from timeframes import resample_bars
+from tracker import LevelTracker
+from trend import LONG_WINDOW, determine_trends
+
+CHUNK_DAYS = 20
+FILTER_INTERVALS = ("5m", "15m", "1h")
+TREND_INTERVALS = ("1m", "5m", "15m", "1h")
+
+
+def iter_chunks(ticker, start_date, end_date, interval="1m", chunk_days=CHUNK_DAYS, store=None, provider=None):
+    """
+    Yield the bars of [start_date, end_date) as frames covering at most chunk_days calendar days each.
+
+    Each chunk goes through fetch_data, so only its own missing ranges are
+    fetched upstream and only its own partitions are read from the store.
+    Empty chunks (weekends, holidays) are skipped.
+    """
+    start, end = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+    while start < end:
+        stop = min(start + timedelta(days=chunk_days), end)
+        data = fetch_data(ticker, start.isoformat(), stop.isoformat(), interval, store, provider)
+        if not data.empty:
+            yield data
+        start = stop
+
+
+def thin_extremes(extremes, tolerance):
+    """
+    Sorted extremes without the values that cannot change analysis.levels_touched at this tolerance.
+
+    A level's band (level - tolerance, level + tolerance) that holds a value but
+    neither of its neighbours lies between them, so a value whose neighbours are
+    closer than the band's width (less a rounding margin) is never the only one
+    touched. Dropping such values one at a time leaves every second gap at
+    least that wide.
+    """
+    if extremes.size < 3:
+        return extremes
+    margin = 4 * math.ulp(max(abs(extremes[0]), abs(extremes[-1])) + tolerance)
+    width = 2 * tolerance - margin
+    kept = [extremes[0]]
+    for value, following in zip(extremes[1:-1].tolist(), extremes[2:].tolist()):
+        if not following - kept[-1] < width:
+            kept.append(value)
+    kept.append(extremes[-1])
+    return np.asarray(kept, dtype=np.float64)
+
+
+class _Tail:
+    """
+    The last rows of a timeframe's High/Low/Close columns.
+    """
+
+    def __init__(self, size):
+        self.rows = deque(maxlen=size)
+
+    def extend(self, data):
+        columns = [data[column].to_numpy(dtype=np.float64)[-self.rows.maxlen:] for column in ("High", "Low", "Close")]
+        self.rows.extend(zip(*columns))
+
+    def frame(self):
+        high, low, close = (np.asarray(values) for values in zip(*self.rows)) if self.rows else ([], [], [])
+        return {"High": high, "Low": low, "Close": close}
+
+
+class ChunkedAnalysis:
+    """
+    Significant levels, confirmed levels and trends accumulated over consecutive 1-minute chunks.
+
+    Chunks must arrive in time order and must not split a session. tolerance and
+    atr_multiple mean the same as in analysis.filter_levels.
+    """
+
+    def __init__(self, tolerance=0.5, atr_multiple=None, atr_window=14, prominence=2, cluster_distance_factor=0.5):
+        self.tolerance = tolerance
+        self.atr_multiple = atr_multiple
+        self.atr_window = atr_window
+        self.levels = LevelTracker(prominence, cluster_distance_factor)
+        self.extremes = {interval: np.empty(0) for interval in FILTER_INTERVALS}
+        self.atr_tails = {interval: _Tail(atr_window + 1) for interval in FILTER_INTERVALS}
+        # determine_trends only reads each series' last LONG_WINDOW non-NaN closes.
+        self.closes = {interval: deque(maxlen=LONG_WINDOW) for interval in TREND_INTERVALS}
+        self.bar_count = 0
+        self.last_time = None
+
+    def add(self, data_1m):
+        """
+        Fold one chunk of 1-minute bars into the running state.
+        """
+        if data_1m.empty:
+            return
+        if self.last_time is not None and data_1m.index[0] <= self.last_time:
+            raise ValueError(f"chunk starting {data_1m.index[0]} does not follow {self.last_time}")
+        self.last_time = data_1m.index[-1]
+        self.bar_count += len(data_1m)
+        self.levels.extend(data_1m)
+        frames = {"1m": data_1m, **resample_bars(data_1m, FILTER_INTERVALS)}
+        for interval in FILTER_INTERVALS:
+            extremes = np.union1d(self.extremes[interval], sorted_extremes(frames[interval]))
+            if self.atr_multiple is None:
+                extremes = thin_extremes(extremes, self.tolerance)
+            self.extremes[interval] = extremes
+            self.atr_tails[interval].extend(frames[interval])
+        for interval in TREND_INTERVALS:
+            closes = frames[interval]["Close"].to_numpy(dtype=np.float64)
+            self.closes[interval].extend(closes[~np.isnan(closes)][-LONG_WINDOW:])
+
+    def significant_levels(self):
+        return self.levels.levels()
+
+    def valid_levels(self, significant_levels=None):
+        levels = np.asarray(self.significant_levels() if significant_levels is None else significant_levels)
+        keep = np.ones(levels.size, dtype=bool)
+        for interval in FILTER_INTERVALS:
+            tolerance = self.tolerance
+            if self.atr_multiple is not None:
+                tolerance = self.atr_multiple * average_true_range(self.atr_tails[interval].frame(), self.atr_window)
+            keep &= levels_touched(levels, self.extremes[interval], tolerance)
+        return levels[keep].tolist()
+
+    def trends(self):
+        return dict(zip(TREND_INTERVALS, determine_trends([list(self.closes[interval]) for interval in TREND_INTERVALS])))
+
+    def result(self):
+        significant_levels = self.significant_levels()
+        return {
+            "bars": self.bar_count,
+            "significant_levels": significant_levels,
+            "valid_levels": self.valid_levels(significant_levels),
+            "trends": self.trends(),
+        }
+
+
+def analyze_chunked(ticker, start_date, end_date, chunk_days=CHUNK_DAYS, store=None, provider=None, **params):
+    """
+    ChunkedAnalysis.result() for one ticker's 1-minute bars, read chunk by chunk.
+
+    params are passed to ChunkedAnalysis.
+    """
+    analysis = ChunkedAnalysis(**params)
+    for chunk in iter_chunks(ticker, start_date, end_date, "1m", chunk_days, store, provider):
+        analysis.add(chunk)
+    return analysis.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Levels and trends over long 1-minute histories, read in chunks.")
+    parser.add_argument("--ticker", required=True)
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS, help="calendar days per chunk")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--atr-multiple", type=float, default=None)
+    parser.add_argument("--output", help="write the result as JSON instead of printing it")
+    args = parser.parse_args(argv)
+
+    result = analyze_chunked(
+        args.ticker, args.start, args.end, args.chunk_days, tolerance=args.tolerance, atr_multiple=args.atr_multiple
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
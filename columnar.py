@@ -0,0 +1,112 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"TAB1"
+ALIGNMENT = 8
+PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+
+
+def _wall_clock_millis(index):
+    """
+    Bar timestamps as int64 milliseconds of exchange wall-clock time.
+
+    Plotly draws epoch numbers as UTC, so the timezone is dropped before
+    converting to keep the candles on the same 9:30-16:00 axis as the JSON path.
+    """
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    return (index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+
+
+def _pad(length):
+    return (-length) % ALIGNMENT
+
+
+def pack_series(header, series):
+    """
+    Encode a small JSON header plus OHLC columns as one length-prefixed binary blob.
+
+    Layout (little-endian):
+        b"TAB1" | uint32 header length | header JSON | zero padding to 8 bytes | columns
+
+    Each series in header["series"] lists its columns with dtype and byte offset
+    from the start of the blob; every column starts on an 8-byte boundary so the
+    client can wrap it in a typed array without copying. Timestamps are int64
+    milliseconds of exchange wall-clock time and prices are float32.
+
+    series is a list of (name, frame) pairs.
+    """
+    columns = []
+    descriptors = []
+    for name, data in series:
+        arrays = [("time", "int64", np.ascontiguousarray(_wall_clock_millis(data.index), dtype="<i8"))]
+        arrays += [
+            (column.lower(), "float32", np.ascontiguousarray(data[column].to_numpy(), dtype="<f4"))
+            for column in PRICE_COLUMNS
+        ]
+        descriptors.append({"name": name, "length": len(data), "columns": arrays})
+        columns.extend(arrays)
+
+    # Offsets depend on the header length, which depends on the offsets; the header is
+    # sized with placeholder offsets first and the digits are padded to a fixed width.
+    def render_header(offsets):
+        payload = dict(header)
+        payload["series"] = [
+            {
+                "name": descriptor["name"],
+                "length": descriptor["length"],
+                "columns": [
+                    {"name": column, "dtype": dtype, "offset": offsets.get((descriptor["name"], column), 0)}
+                    for column, dtype, _ in descriptor["columns"]
+                ],
+            }
+            for descriptor in descriptors
+        ]
+        return json.dumps(payload, separators=(",", ":")).encode()
+
+    width = 12
+    placeholder = {
+        (descriptor["name"], column): 10 ** (width - 1)
+        for descriptor in descriptors for column, _, _ in descriptor["columns"]
+    }
+    header_length = len(render_header(placeholder))
+    data_start = 8 + header_length + _pad(8 + header_length)
+
+    offsets = {}
+    cursor = data_start
+    for descriptor in descriptors:
+        for column, _, array in descriptor["columns"]:
+            offsets[(descriptor["name"], column)] = cursor
+            cursor += array.nbytes + _pad(array.nbytes)
+
+    header_bytes = render_header(offsets)
+    header_bytes += b" " * (header_length - len(header_bytes))
+
+    parts = [MAGIC, struct.pack("<I", header_length), header_bytes, b"\0" * (data_start - 8 - header_length)]
+    for _, _, array in columns:
+        parts.append(array.tobytes())
+        parts.append(b"\0" * _pad(array.nbytes))
+    return b"".join(parts)
+
+
+def unpack_series(blob):
+    """
+    Decode a pack_series blob into (header, {series name: {column: array}}).
+    """
+    if blob[:4] != MAGIC:
+        raise ValueError("Not a TAB1 payload")
+    (header_length,) = struct.unpack_from("<I", blob, 4)
+    header = json.loads(blob[8:8 + header_length])
+    series = {}
+    for descriptor in header["series"]:
+        series[descriptor["name"]] = {
+            column["name"]: np.frombuffer(
+                blob, dtype="<i8" if column["dtype"] == "int64" else "<f4",
+                count=descriptor["length"], offset=column["offset"],
+            )
+            for column in descriptor["columns"]
+        }
+    return header, series
@@ -1,32 +1,16 @@
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
 
-def fetch_data(ticker, start_date, end_date, interval):
-    return yf.download(ticker, start=start_date, end=end_date, interval=interval)
+from datastore import fetch_data
+from render import IMAGE_FORMATS, image_path, plot_trends
 
-def plot_trends(stock_data, sector_data, index_data, stock_ticker, sector_ticker, index_ticker):
-    plt.figure(figsize=(14, 10))
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a stock's trend with its sector and index.")
+    parser.add_argument("--output-dir", help="write the chart as an image file here instead of showing it")
+    parser.add_argument("--format", default="png", choices=IMAGE_FORMATS)
+    return parser.parse_args(argv)
 
-    plt.subplot(3, 1, 1)
-    plt.plot(index_data['Close'], label=f'{index_ticker} Close')
-    plt.title(f'{index_ticker} Trend')
-    plt.legend()
-
-    plt.subplot(3, 1, 2)
-    plt.plot(sector_data['Close'], label=f'{sector_ticker} Close')
-    plt.title(f'{sector_ticker} Trend')
-    plt.legend()
-
-    plt.subplot(3, 1, 3)
-    plt.plot(stock_data['Close'], label=f'{stock_ticker} Close')
-    plt.title(f'{stock_ticker} Trend')
-    plt.legend()
-
-    plt.tight_layout()
-    plt.show()
-
-def main():
+def main(argv=None):
+    args = parse_args(argv)
     # Define the tickers and date range
     stock_ticker = "NVDA"
     sector_ticker = "XLK"  # Technology Select Sector SPDR Fund
@@ -41,7 +25,10 @@ def main():
     index_data = fetch_data(index_ticker, start_date, end_date, interval)
 
     # Plot the trends
-    plot_trends(stock_data, sector_data, index_data, stock_ticker, sector_ticker, index_ticker)
+    plot_trends(
+        stock_data, sector_data, index_data, stock_ticker, sector_ticker, index_ticker,
+        output=args.output_dir and image_path(args.output_dir, f"{stock_ticker}_trends", args.format),
+    )
 
 if __name__ == "__main__":
     main()
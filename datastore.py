@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+from contextlib import ExitStack
+from datetime import date, timedelta
+
+import pandas as pd
+
+from providers import ReplayProvider, YahooProvider, safe_ticker
+
+CACHE_DIR = os.environ.get(
+    "TA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "technical_analysis")
+)
+INTRADAY_INTERVALS = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+# Serve bars from replay files under this directory instead of Yahoo (offline runs).
+REPLAY_DIR = os.environ.get("TA_REPLAY_DIR")
+# Serve reads from memory-mapped columns shared by all worker processes (see sharedstore.py).
+SHARED_STORE = os.environ.get("TA_SHARED_STORE", "").lower() in ("1", "true", "yes")
+
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _trim_weekends(start, end):
+    while start < end and start.weekday() >= 5:
+        start += timedelta(days=1)
+    while end > start and (end - timedelta(days=1)).weekday() >= 5:
+        end -= timedelta(days=1)
+    return start, end
+
+
+class BarStore:
+    """
+    On-disk Parquet store of OHLCV bars per (ticker, interval).
+
+    Intraday bars are partitioned by trading day and daily bars by year. A small
+    manifest records which date ranges have already been fetched so repeat calls
+    only go upstream for the gaps. The current day is never marked as covered
+    because its bars are still being written.
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        self._fetch_locks = {}
+
+    def fetch_lock(self, ticker, interval):
+        """
+        Lock held while filling one series' gaps, so concurrent requests for it fetch upstream once.
+        """
+        with self._lock:
+            return self._fetch_locks.setdefault((ticker, interval), threading.RLock())
+
+    def _dir(self, ticker, interval):
+        return os.path.join(self.root, safe_ticker(ticker), interval)
+
+    def _manifest_path(self, ticker, interval):
+        return os.path.join(self._dir(ticker, interval), "manifest.json")
+
+    @staticmethod
+    def _partition_key(day, interval):
+        return day.isoformat() if interval in INTRADAY_INTERVALS else str(day.year)
+
+    def covered_ranges(self, ticker, interval):
+        path = self._manifest_path(ticker, interval)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in json.load(f)["covered"]]
+
+    def mark_covered(self, ticker, interval, start_date, end_date):
+        start, end = _to_date(start_date), min(_to_date(end_date), date.today())
+        if start >= end:
+            return
+        with self._lock:
+            ranges = _merge_ranges(self.covered_ranges(ticker, interval) + [(start, end)])
+            self._atomic_write_json(
+                self._manifest_path(ticker, interval),
+                {"covered": [[s.isoformat(), e.isoformat()] for s, e in ranges]},
+            )
+
+    def missing_ranges(self, ticker, interval, start_date, end_date):
+        """
+        Return the [start, end) date ranges inside the request that are not cached yet.
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        missing = []
+        cursor = start
+        for cov_start, cov_end in self.covered_ranges(ticker, interval):
+            if cov_end <= cursor or cov_start >= end:
+                continue
+            if cov_start > cursor:
+                missing.append((cursor, cov_start))
+            cursor = max(cursor, cov_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        missing = [_trim_weekends(s, e) for s, e in missing]
+        return [(s, e) for s, e in missing if s < e]
+
+    def write(self, ticker, interval, data):
+        if data.empty:
+            return
+        directory = self._dir(ticker, interval)
+        keys = pd.Index([self._partition_key(day, interval) for day in data.index.date])
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            for key, part in data.groupby(keys, sort=False):
+                path = os.path.join(directory, f"{key}.parquet")
+                if os.path.exists(path):
+                    part = pd.concat([pd.read_parquet(path), part])
+                    part = part[~part.index.duplicated(keep="last")].sort_index()
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                part.to_parquet(tmp_path)
+                os.replace(tmp_path, path)
+
+    def read(self, ticker, interval, start_date, end_date):
+        start, end = _to_date(start_date), _to_date(end_date)
+        directory = self._dir(ticker, interval)
+        if not os.path.isdir(directory):
+            return pd.DataFrame()
+        first_key, last_key = self._partition_key(start, interval), self._partition_key(end, interval)
+        paths = [
+            os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if name.endswith(".parquet") and first_key <= name[:-len(".parquet")] <= last_key
+        ]
+        if not paths:
+            return pd.DataFrame()
+        data = pd.concat([pd.read_parquet(path) for path in paths])
+        days = pd.Index(data.index.date)
+        return data[(days >= start) & (days < end)]
+
+    @staticmethod
+    def _atomic_write_json(path, payload):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+
+_default_store = None
+_default_provider = None
+
+
+def get_default_store():
+    global _default_store
+    if _default_store is None:
+        if SHARED_STORE:
+            from sharedstore import SharedBarStore
+
+            _default_store = SharedBarStore()
+        else:
+            _default_store = BarStore()
+    return _default_store
+
+
+def get_default_provider():
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = ReplayProvider(REPLAY_DIR) if REPLAY_DIR else YahooProvider()
+    return _default_provider
+
+
+def set_default_provider(provider):
+    """
+    Swap the provider used by fetch_data, e.g. a ReplayProvider for tests, benchmarks or offline runs.
+    """
+    global _default_provider
+    _default_provider = provider
+
+
+def fetch_data(ticker, start_date, end_date, interval, store=None, provider=None):
+    """
+    Return bars for [start_date, end_date), fetching only the ranges missing from the local store.
+    """
+    store = store or get_default_store()
+    provider = provider or get_default_provider()
+    with store.fetch_lock(ticker, interval):
+        for gap_start, gap_end in store.missing_ranges(ticker, interval, start_date, end_date):
+            data = provider.fetch(ticker, gap_start.isoformat(), gap_end.isoformat(), interval)
+            _store_gap(store, ticker, interval, gap_start, gap_end, data)
+    return store.read(ticker, interval, start_date, end_date)
+
+
+def _store_gap(store, ticker, interval, gap_start, gap_end, data):
+    if data.empty:
+        # An empty past gap is a holiday or a range with no trading; cover it so it is
+        # not fetched again. Empty results touching today are retried, since
+        # yfinance also returns an empty frame on errors.
+        if _to_date(gap_end) <= date.today():
+            store.mark_covered(ticker, interval, gap_start, gap_end)
+        return
+    store.write(ticker, interval, data)
+    store.mark_covered(ticker, interval, gap_start, gap_end)
+
+
+def fetch_many(tickers, start_date, end_date, interval, store=None, provider=None):
+    """
+    Return {ticker: bars} for [start_date, end_date), like fetch_data for each ticker.
+
+    Tickers missing the same date range are fetched together in one
+    provider.fetch_many request, so a universe with a cold cache costs one
+    upstream call per distinct gap instead of one per ticker. Every series'
+    fetch lock is held while its gaps are filled, taken in sorted order so
+    overlapping batches cannot deadlock.
+    """
+    store = store or get_default_store()
+    provider = provider or get_default_provider()
+    with ExitStack() as locks:
+        for ticker in sorted(set(tickers)):
+            locks.enter_context(store.fetch_lock(ticker, interval))
+        gaps = {}
+        for ticker in tickers:
+            for gap in store.missing_ranges(ticker, interval, start_date, end_date):
+                gaps.setdefault(gap, []).append(ticker)
+        for (gap_start, gap_end), group in gaps.items():
+            fetched = provider.fetch_many(group, gap_start.isoformat(), gap_end.isoformat(), interval)
+            for ticker in group:
+                _store_gap(store, ticker, interval, gap_start, gap_end, fetched.get(ticker, pd.DataFrame()))
+    return {ticker: store.read(ticker, interval, start_date, end_date) for ticker in tickers}
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHART_WIDTH = 1200
+PIXELS_PER_CANDLE = 2
+
+
+def target_points(chart_width, pixels_per_candle=PIXELS_PER_CANDLE):
+    """
+    Number of candles worth drawing on a chart of the given pixel width.
+    """
+    return max(int(chart_width) // pixels_per_candle, 1)
+
+
+def downsample_ohlc(data, max_points):
+    """
+    Reduce OHLC bars to at most about max_points candles by min-max bucketing.
+
+    Consecutive bars are merged into fixed-size buckets that never cross a trading
+    day, keeping the first open, highest high, lowest low, last close and summed
+    volume, so every wick extreme survives. Each bucket is stamped with its first
+    bar's timestamp. Frames already within budget are returned unchanged.
+    """
+    count = len(data)
+    if count <= max_points or count == 0:
+        return data
+
+    days = data.index.normalize() if isinstance(data.index, pd.DatetimeIndex) else np.zeros(count)
+    day_codes = pd.factorize(days)[0].astype(np.int64)
+    num_days = int(day_codes[-1]) + 1
+    bucket_size = math.ceil(count / max(max_points - num_days, 1))
+
+    positions = np.arange(count)
+    day_starts = np.flatnonzero(np.r_[True, day_codes[1:] != day_codes[:-1]])
+    positions_in_day = positions - np.repeat(day_starts, np.diff(np.r_[day_starts, count]))
+    keys = day_codes * count + positions_in_day // bucket_size
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], count] - 1
+
+    bars = {
+        "Open": data["Open"].to_numpy()[starts],
+        "High": np.fmax.reduceat(data["High"].to_numpy(dtype=np.float64), starts),
+        "Low": np.fmin.reduceat(data["Low"].to_numpy(dtype=np.float64), starts),
+        "Close": data["Close"].to_numpy()[ends],
+    }
+    if "Volume" in data:
+        bars["Volume"] = np.add.reduceat(data["Volume"].to_numpy(dtype=np.float64), starts)
+    return pd.DataFrame(bars, index=data.index[starts])
+
+
+def slice_range(data, x0=None, x1=None):
+    """
+    Bars whose timestamps fall inside [x0, x1].
+
+    Chart ranges come back from Plotly as wall-clock strings without an offset, so
+    naive bounds are localized to the frame's timezone.
+    """
+    tz = getattr(data.index, "tz", None)
+
+    def bound(value):
+        if value is None:
+            return None
+        ts = pd.Timestamp(value)
+        if tz is not None and ts.tzinfo is None:
+            ts = ts.tz_localize(tz)
+        elif tz is None and ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        return ts
+
+    return data.loc[bound(x0):bound(x1)]
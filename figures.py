@@ -0,0 +1,110 @@
+import json
+from functools import lru_cache
+
+INTERVAL_TITLES = {"1m": "1 Minute", "5m": "5 Minute", "15m": "15 Minute", "1h": "1 Hour"}
+
+_XAXIS = {
+    "rangeslider": {"visible": True},
+    "rangebreaks": [
+        {"bounds": ["sat", "mon"]},  # Hide weekends
+        {"bounds": [16, 9.5], "pattern": "hour"},  # Hide hours outside 9:30am-4pm
+    ],
+    "fixedrange": False,
+    "title": {"text": "Time"},
+}
+_YAXIS = {"fixedrange": False, "title": {"text": "Price"}}
+
+
+@lru_cache(maxsize=None)
+def _template():
+    import plotly.io as pio
+
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+
+def to_json(figure):
+    """
+    Serialize a figure dict with Plotly's encoder, importing plotly only on first use.
+    """
+    import plotly.utils
+
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def base_layout():
+    """
+    Timeframe-independent layout shared by every chart: template, axes and session rangebreaks.
+
+    The template is resolved once per process; callers get a fresh top-level dict
+    but share the nested template and axis objects, which are never mutated.
+    """
+    return {
+        "template": _template(),
+        "xaxis": _XAXIS,
+        "yaxis": _YAXIS,
+    }
+
+
+def level_overlays(levels, x):
+    """
+    Dashed line shapes and price annotations for a list of levels, built in one pass.
+
+    Equivalent to calling fig.add_hline and fig.add_annotation per level, without
+    Plotly re-validating the layout on each call.
+    """
+    shapes = [
+        {
+            "type": "line", "xref": "x domain", "yref": "y", "x0": 0, "x1": 1, "y0": level, "y1": level,
+            "line": {"color": "yellow", "dash": "dash"},
+        }
+        for level in levels
+    ]
+    annotations = [
+        {
+            "x": x, "y": level, "text": f"{level:.2f}", "showarrow": False,
+            "font": {"color": "red"}, "xshift": -10, "yshift": 10,
+        }
+        for level in levels
+    ]
+    return shapes, annotations
+
+
+def candlestick_figure(data, title, overlays):
+    """
+    A figure dict with one candlestick trace, the shared base layout and prebuilt level overlays.
+
+    Returned as a plain dict in Plotly's figure schema; it serializes with
+    plotly.utils.PlotlyJSONEncoder exactly like a go.Figure.
+    """
+    shapes, annotations = overlays
+    layout = base_layout()
+    layout.update({"title": {"text": title}, "shapes": shapes, "annotations": annotations})
+    trace = {
+        "type": "candlestick",
+        "x": data.index,
+        "open": data['Open'].to_numpy(),
+        "high": data['High'].to_numpy(),
+        "low": data['Low'].to_numpy(),
+        "close": data['Close'].to_numpy(),
+    }
+    return {"data": [trace], "layout": layout}
+
+
+def build_figures(stock_ticker, result):
+    """
+    The four candlestick figures (1m, 5m, 15m, 1h) for a main.run_analysis result.
+
+    The 1m chart shows every significant level and the others the confirmed ones;
+    each overlay list is built once and shared by the figures that draw it.
+    """
+    x = result["first_timestamp"]
+    all_levels = level_overlays(result["significant_levels"], x)
+    valid_levels = level_overlays(result["valid_levels"], x)
+    return tuple(
+        candlestick_figure(
+            data,
+            f'{stock_ticker} - {INTERVAL_TITLES[interval]} Interval ({result["trend_stock"]})',
+            all_levels if interval == "1m" else valid_levels,
+        )
+        for interval, data in result["charts"].items()
+    )
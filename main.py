@@ -1,56 +1,121 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-import yfinance as yf
 import pandas as pd
-import numpy as np
-from scipy.signal import find_peaks
-import plotly.graph_objects as go
-import plotly.utils
 import json
 
+import metrics
+from analysis import analyze_and_filter_levels, find_significant_levels
+from cache import ResultCache, range_includes_today
+from columnar import pack_series
+from datastore import fetch_data
+from downsample import DEFAULT_CHART_WIDTH, downsample_ohlc, slice_range, target_points
+from figures import build_figures, to_json
+from relative import interval_closes, relative_summary
+from screen import screen_universe
+from stream import LiveAnalysis
+from timeframes import resample_bars
+from trend import determine_trends
+
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
 
-def find_significant_levels(data, prominence=2, cluster_distance_factor=0.5):
-    highs = data['High']
-    lows = data['Low']
-    price_range = highs.max() - lows.min()
-    adjusted_cluster_distance = price_range * cluster_distance_factor / 100
+# Bounded pool for blocking provider calls so slow downloads never run on the event loop.
+FETCH_WORKERS = int(os.environ.get("TA_FETCH_WORKERS", "16"))
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+# Level confirmation tolerance: absolute price distance, or a multiple of each timeframe's ATR when set.
+LEVEL_TOLERANCE = float(os.environ.get("TA_LEVEL_TOLERANCE", "0.5"))
+LEVEL_ATR_MULTIPLE = float(os.environ["TA_LEVEL_ATR_MULTIPLE"]) if os.environ.get("TA_LEVEL_ATR_MULTIPLE") else None
+
+# /plot/ responses are cached briefly while the range includes today and much longer once it is historical.
+RESULT_CACHE_BYTES = int(os.environ.get("TA_RESULT_CACHE_BYTES", str(256 * 1024 * 1024)))
+RESULT_TTL_LIVE = float(os.environ.get("TA_RESULT_TTL_LIVE", "60"))
+RESULT_TTL_HISTORICAL = float(os.environ.get("TA_RESULT_TTL_HISTORICAL", str(24 * 60 * 60)))
+result_cache = ResultCache(max_bytes=RESULT_CACHE_BYTES)
+
+ZOOM_INTERVALS = ("1m", "5m", "15m", "1h")
+
+# Seconds between upstream polls for each open /stream/ connection.
+STREAM_POLL_SECONDS = float(os.environ.get("TA_STREAM_POLL_SECONDS", "15"))
+
+# Add a Server-Timing header with per-stage durations to every response.
+SERVER_TIMING = os.environ.get("TA_SERVER_TIMING", "").lower() in ("1", "true", "yes")
 
-    peak_indices, _ = find_peaks(highs, prominence=prominence)
-    trough_indices, _ = find_peaks(-lows, prominence=prominence)
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "ta_result_cache_events_total", "Result cache lookups by outcome.", ("event",),
+    lambda: [((event,), result_cache.stats()[event]) for event in ("hits", "misses", "coalesced", "evictions", "expirations")],
+    kind="counter"
+))
+metrics.REGISTRY.register(metrics.CallbackMetric(
+    "ta_result_cache_bytes", "Approximate bytes held by the result cache.", (),
+    lambda: [((), result_cache.current_bytes)]
+))
 
-    peak_levels = highs.iloc[peak_indices].values
-    trough_levels = lows.iloc[trough_indices].values
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    known_paths = {route.path for route in app.routes}
+    path = request.url.path if request.url.path in known_paths else "other"
+    timer, token = metrics.start_request(path)
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.end_request(token)
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - timer.started, path, str(response.status_code))
+    if "content-length" in response.headers:
+        metrics.RESPONSE_BYTES.observe(int(response.headers["content-length"]), path)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timer.server_timing()
+    return response
 
-    all_levels = np.sort(np.concatenate([peak_levels, trough_levels]))
+def timed_fetch(ticker, start_date, end_date, interval):
+    with metrics.stage(f"fetch_{interval}"):
+        return fetch_data(ticker, start_date, end_date, interval)
 
-    clusters = []
-    current_cluster = [all_levels[0]]
+async def fetch_all(requests, start_date, end_date):
+    """
+    Fetch several (ticker, interval) series concurrently on the fetch pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*[
+        loop.run_in_executor(
+            fetch_executor, contextvars.copy_context().run, timed_fetch, ticker, start_date, end_date, interval
+        )
+        for ticker, interval in requests
+    ])
 
-    for level in all_levels[1:]:
-        if level - current_cluster[-1] <= adjusted_cluster_distance:
-            current_cluster.append(level)
-        else:
-            clusters.append(current_cluster)
-            current_cluster = [level]
-    clusters.append(current_cluster)
+def plot_requests(stock_ticker, sector_ticker, index_ticker, relative=False):
+    """
+    The (ticker, interval) series a /plot/ request fetches; the benchmarks' 1m bars only for relative stats.
+    """
+    requests = [(stock_ticker, "1m"), (sector_ticker, "1d"), (index_ticker, "1d")]
+    if relative:
+        requests += [(sector_ticker, "1m"), (index_ticker, "1m")]
+    return requests
 
-    significant_levels = [np.mean(cluster) for cluster in clusters]
-    return significant_levels
+async def cached_result(key, compute, start_date, end_date):
+    """
+    Look key up in the result cache, computing it once on a miss, and note the outcome for Server-Timing.
+    """
+    ttl = RESULT_TTL_LIVE if range_includes_today(start_date, end_date) else RESULT_TTL_HISTORICAL
+    outcome = "hit"
 
-def fetch_data(ticker, start_date, end_date, interval):
-    data = yf.download(ticker, start=start_date, end=end_date, interval=interval)
-    return data
+    async def tracked_compute():
+        nonlocal outcome
+        outcome = "miss"
+        return await compute()
 
-def determine_trend(data):
-    short_ma = data['Close'].rolling(window=50).mean()
-    long_ma = data['Close'].rolling(window=200).mean()
-    if short_ma.iloc[-1] > long_ma.iloc[-1]:
-        return "Bullish"
-    else:
-        return "Bearish"
+    content = await result_cache.get_or_compute(key, tracked_compute, ttl)
+    metrics.note("cache", outcome)
+    return content
 
 @app.get("/", response_class=HTMLResponse)
 async def read_form(request: Request):
@@ -62,95 +127,280 @@ async def plot_significant_levels(
     sector_ticker: str = Form(...),
     index_ticker: str = Form(...),
     start_date: str = Form(...),
-    end_date: str = Form(...)
+    end_date: str = Form(...),
+    chart_width: int = Form(DEFAULT_CHART_WIDTH),
+    relative: bool = Form(False)
+):
+    async def compute():
+        data_1m, data_sector, data_index, *benchmarks_1m = await fetch_all(
+            plot_requests(stock_ticker, sector_ticker, index_ticker, relative), start_date, end_date
+        )
+        return await run_in_threadpool(
+            build_plot_payload, stock_ticker, data_1m, data_sector, data_index, chart_width, *benchmarks_1m
+        )
+
+    key = (stock_ticker, sector_ticker, index_ticker, start_date, end_date, chart_width, relative)
+    content = await cached_result(key, compute, start_date, end_date)
+    if content is None:
+        return JSONResponse(status_code=404, content={"message": "No data found for the given parameters."})
+    return JSONResponse(content=content)
+
+@app.post("/plot/binary/")
+async def plot_significant_levels_binary(
+    stock_ticker: str = Form(...),
+    sector_ticker: str = Form(...),
+    index_ticker: str = Form(...),
+    start_date: str = Form(...),
+    end_date: str = Form(...),
+    chart_width: int = Form(DEFAULT_CHART_WIDTH),
+    relative: bool = Form(False)
 ):
-    data_1m = fetch_data(stock_ticker, start_date, end_date, "1m")
-    data_5m = fetch_data(stock_ticker, start_date, end_date, "5m")
-    data_15m = fetch_data(stock_ticker, start_date, end_date, "15m")
-    data_1h = fetch_data(stock_ticker, start_date, end_date, "1h")
+    """
+    Same analysis as /plot/, returned as packed typed-array columns for the client to draw.
+    """
+    async def compute():
+        data_1m, data_sector, data_index, *benchmarks_1m = await fetch_all(
+            plot_requests(stock_ticker, sector_ticker, index_ticker, relative), start_date, end_date
+        )
+        return await run_in_threadpool(
+            build_binary_payload, stock_ticker, data_1m, data_sector, data_index, chart_width, *benchmarks_1m
+        )
 
-    data_sector = fetch_data(sector_ticker, start_date, end_date, "1d")
-    data_index = fetch_data(index_ticker, start_date, end_date, "1d")
+    key = ("binary", stock_ticker, sector_ticker, index_ticker, start_date, end_date, chart_width, relative)
+    content = await cached_result(key, compute, start_date, end_date)
+    if content is None:
+        return JSONResponse(status_code=404, content={"message": "No data found for the given parameters."})
+    return Response(content=content, media_type="application/octet-stream")
+
+def build_binary_payload(stock_ticker, data_1m, data_sector, data_index, chart_width=DEFAULT_CHART_WIDTH,
+                         sector_1m=None, index_1m=None):
+    """
+    Run the analysis and pack the chart columns with columnar.pack_series, or return None if any series is empty.
+    """
+    result = run_analysis(data_1m, data_sector, data_index, chart_width, sector_1m, index_1m)
+    if result is None:
+        return None
+    header = {
+        "stock_ticker": stock_ticker,
+        "significant_levels": result["significant_levels"],
+        "valid_levels": result["valid_levels"],
+        "trend_stock": result["trend_stock"],
+        "trend_sector": result["trend_sector"],
+        "trend_index": result["trend_index"],
+        "relative": result.get("relative")
+    }
+    with metrics.stage("encode"):
+        return pack_series(header, list(result["charts"].items()))
 
-    if data_1m.empty or data_5m.empty or data_15m.empty or data_1h.empty or data_sector.empty or data_index.empty:
+@app.get("/plot/zoom/", response_class=JSONResponse)
+async def zoom_candles(
+    stock_ticker: str,
+    start_date: str,
+    end_date: str,
+    interval: str = "1m",
+    x0: Optional[str] = None,
+    x1: Optional[str] = None,
+    chart_width: int = DEFAULT_CHART_WIDTH
+):
+    if interval not in ZOOM_INTERVALS:
+        return JSONResponse(status_code=400, content={"message": f"Unsupported interval {interval!r}."})
+    (data_1m,) = await fetch_all([(stock_ticker, "1m")], start_date, end_date)
+    content = await run_in_threadpool(build_zoom_payload, data_1m, interval, x0, x1, chart_width)
+    if content is None:
         return JSONResponse(status_code=404, content={"message": "No data found for the given parameters."})
+    return JSONResponse(content=content)
+
+def build_zoom_payload(data_1m, interval, x0, x1, chart_width):
+    """
+    Candles for the visible [x0, x1] range of one timeframe, downsampled to the chart width.
+    """
+    if data_1m.empty:
+        return None
+    data = data_1m if interval == "1m" else resample_bars(data_1m, (interval,))[interval]
+    data = downsample_ohlc(slice_range(data, x0, x1), target_points(chart_width))
+    return {
+        "x": [ts.isoformat() for ts in data.index],
+        "open": data['Open'].tolist(),
+        "high": data['High'].tolist(),
+        "low": data['Low'].tolist(),
+        "close": data['Close'].tolist()
+    }
 
-    significant_levels_1m = find_significant_levels(data_1m)
-    valid_levels = find_significant_levels(data_1m)
-
-    trend_stock = determine_trend(data_1h)
-    trend_sector = determine_trend(data_sector)
-    trend_index = determine_trend(data_index)
-
-    fig1 = go.Figure(data=[go.Candlestick(
-        x=data_1m.index,
-        open=data_1m['Open'],
-        high=data_1m['High'],
-        low=data_1m['Low'],
-        close=data_1m['Close']
-    )])
-    fig2 = go.Figure(data=[go.Candlestick(
-        x=data_5m.index,
-        open=data_5m['Open'],
-        high=data_5m['High'],
-        low=data_5m['Low'],
-        close=data_5m['Close']
-    )])
-    fig3 = go.Figure(data=[go.Candlestick(
-        x=data_15m.index,
-        open=data_15m['Open'],
-        high=data_15m['High'],
-        low=data_15m['Low'],
-        close=data_15m['Close']
-    )])
-    fig4 = go.Figure(data=[go.Candlestick(
-        x=data_1h.index,
-        open=data_1h['Open'],
-        high=data_1h['High'],
-        low=data_1h['Low'],
-        close=data_1h['Close']
-    )])
-
-    for fig in [fig1, fig2, fig3, fig4]:
-        for level in significant_levels_1m:
-            fig.add_hline(y=level, line=dict(color='yellow', dash='dash'))
-            fig.add_annotation(
-                x=data_1m.index[0],
-                y=level,
-                text=f'{level:.2f}',
-                showarrow=False,
-                font=dict(color='red'),
-                xshift=-10,
-                yshift=10
+@app.get("/stream/")
+async def stream_charts(
+    request: Request,
+    stock_ticker: str,
+    sector_ticker: str,
+    index_ticker: str,
+    start_date: str,
+    end_date: str,
+    chart_width: int = DEFAULT_CHART_WIDTH
+):
+    """
+    Server-sent events: one "snapshot" with the /plot/ payload, then an "update" delta whenever bars change.
+
+    Each poll fetches only the bars from the newest bar's day onwards and feeds
+    them to a LiveAnalysis, so updates cost time and bandwidth in proportion to
+    what changed rather than to the history. Only a range that includes today is
+    polled; for a past range the stream sends the snapshot and an "end" event,
+    which tells the client to close instead of reconnecting.
+    """
+    requests = [(stock_ticker, "1m"), (sector_ticker, "1d"), (index_ticker, "1d")]
+    data_1m, data_sector, data_index = await fetch_all(requests, start_date, end_date)
+    if data_1m.empty or data_sector.empty or data_index.empty:
+        return JSONResponse(status_code=404, content={"message": "No data found for the given parameters."})
+    try:
+        live = await run_in_threadpool(
+            LiveAnalysis, data_1m, data_sector, data_index, tolerance=LEVEL_TOLERANCE, atr_multiple=LEVEL_ATR_MULTIPLE
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
+    snapshot = await run_in_threadpool(build_stream_snapshot, stock_ticker, live, chart_width)
+
+    async def events():
+        yield sse_event("snapshot", snapshot)
+        if not range_includes_today(start_date, end_date):
+            yield sse_event("end", {})
+            return
+        while not await request.is_disconnected():
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+            since = live.last_time.date().isoformat()
+            data_1m, data_sector, data_index = await fetch_all(requests, since, end_date)
+            delta = await run_in_threadpool(live.apply, data_1m, data_sector, data_index)
+            yield sse_event("update", delta) if delta else ": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+def build_stream_snapshot(stock_ticker, live, chart_width=DEFAULT_CHART_WIDTH):
+    """
+    The /plot/ payload for a LiveAnalysis, plus the raw levels the client redraws on updates.
+    """
+    result = live.snapshot(chart_width)
+    content = encode_plot_payload(stock_ticker, result)
+    content.update({
+        "significant_levels": result["significant_levels"],
+        "valid_levels": result["valid_levels"],
+        "first_timestamp": result["first_timestamp"].isoformat(),
+    })
+    return content
+
+@app.post("/screen/", response_class=JSONResponse)
+async def screen(
+    tickers: str = Form(...),
+    sector_ticker: str = Form(...),
+    index_ticker: str = Form(...),
+    start_date: str = Form(...),
+    end_date: str = Form(...)
+):
+    """
+    Levels and trends for a comma- or whitespace-separated ticker list, without building figures.
+    """
+    symbols = list(dict.fromkeys(tickers.replace(",", " ").split()))
+    if not symbols:
+        return JSONResponse(status_code=400, content={"message": "No tickers given."})
+    table = await run_in_threadpool(
+        screen_universe, symbols, sector_ticker, index_ticker, start_date, end_date,
+        tolerance=LEVEL_TOLERANCE, atr_multiple=LEVEL_ATR_MULTIPLE
+    )
+    return JSONResponse(content={"rows": json.loads(table.reset_index().to_json(orient="records"))})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats", response_class=JSONResponse)
+async def cache_stats():
+    return JSONResponse(content=result_cache.stats())
+
+def run_analysis(data_1m, data_sector, data_index, chart_width=DEFAULT_CHART_WIDTH, sector_1m=None, index_1m=None):
+    """
+    Compute levels, trends and the downsampled chart frames, or return None if any series is empty.
+
+    With the sector's and index's 1-minute bars, the result also carries the
+    stock's latest rolling relative strength, correlation and beta against each.
+    """
+    if data_1m.empty or data_sector.empty or data_index.empty:
+        return None
+    with metrics.stage("resample"):
+        frames = resample_bars(data_1m, ("5m", "15m", "1h"))
+    data_5m, data_15m, data_1h = frames["5m"], frames["15m"], frames["1h"]
+    if data_5m.empty or data_15m.empty or data_1h.empty:
+        return None
+    for interval, data in (("1m", data_1m), ("5m", data_5m), ("15m", data_15m), ("1h", data_1h)):
+        metrics.observe_bars(interval, len(data))
+
+    with metrics.stage("levels"):
+        significant_levels_1m = find_significant_levels(data_1m)
+    with metrics.stage("filter_levels"):
+        valid_levels = analyze_and_filter_levels(
+            data_1m, significant_levels_1m, data_5m, data_15m, data_1h,
+            tolerance=LEVEL_TOLERANCE, atr_multiple=LEVEL_ATR_MULTIPLE
+        )
+
+    with metrics.stage("trends"):
+        trend_stock, trend_sector, trend_index = determine_trends(
+            [data_1h['Close'], data_sector['Close'], data_index['Close']]
+        )
+
+    relative = None
+    if sector_1m is not None and index_1m is not None and not sector_1m.empty and not index_1m.empty:
+        with metrics.stage("relative"):
+            relative = relative_summary(
+                interval_closes(data_1m), interval_closes(sector_1m), interval_closes(index_1m)
             )
 
-    for fig in [fig1, fig2, fig3, fig4]:
-        fig.update_xaxes(
-            rangeslider_visible=True,
-            rangebreaks=[
-                dict(bounds=["sat", "mon"]),  # Hide weekends
-                dict(bounds=[16, 9.5], pattern="hour")  # Hide hours outside 9:30am-4pm
-            ],
-            fixedrange=False
+    # Levels and trends above use full-resolution bars; only the drawn candles are downsampled.
+    with metrics.stage("downsample"):
+        max_points = target_points(chart_width)
+        chart_1m, chart_5m, chart_15m, chart_1h = (
+            downsample_ohlc(data, max_points) for data in (data_1m, data_5m, data_15m, data_1h)
         )
-        fig.update_yaxes(fixedrange=False)
+    return {
+        "charts": {"1m": chart_1m, "5m": chart_5m, "15m": chart_15m, "1h": chart_1h},
+        "first_timestamp": data_1m.index[0],
+        "significant_levels": significant_levels_1m,
+        "valid_levels": valid_levels,
+        "trend_stock": trend_stock,
+        "trend_sector": trend_sector,
+        "trend_index": trend_index,
+        "relative": relative
+    }
+
+def build_plot_payload(stock_ticker, data_1m, data_sector, data_index, chart_width=DEFAULT_CHART_WIDTH,
+                       sector_1m=None, index_1m=None):
+    """
+    Run the analysis and build the Plotly JSON chart payload, or return None if any series is empty.
+    """
+    result = run_analysis(data_1m, data_sector, data_index, chart_width, sector_1m, index_1m)
+    if result is None:
+        return None
+    return encode_plot_payload(stock_ticker, result)
 
-    fig1.update_layout(title=f'{stock_ticker} - 1 Minute Interval ({trend_stock})', yaxis_title='Price', xaxis_title='Time')
-    fig2.update_layout(title=f'{stock_ticker} - 5 Minute Interval ({trend_stock})', yaxis_title='Price', xaxis_title='Time')
-    fig3.update_layout(title=f'{stock_ticker} - 15 Minute Interval ({trend_stock})', yaxis_title='Price', xaxis_title='Time')
-    fig4.update_layout(title=f'{stock_ticker} - 1 Hour Interval ({trend_stock})', yaxis_title='Price', xaxis_title='Time')
+def encode_plot_payload(stock_ticker, result):
+    """
+    Figures and trends for a run_analysis-shaped result, with each figure as a Plotly JSON string.
+    """
+    with metrics.stage("figures"):
+        fig1, fig2, fig3, fig4 = build_figures(stock_ticker, result)
 
-    graphJSON1 = json.dumps(fig1, cls=plotly.utils.PlotlyJSONEncoder)
-    graphJSON2 = json.dumps(fig2, cls=plotly.utils.PlotlyJSONEncoder)
-    graphJSON3 = json.dumps(fig3, cls=plotly.utils.PlotlyJSONEncoder)
-    graphJSON4 = json.dumps(fig4, cls=plotly.utils.PlotlyJSONEncoder)
+    with metrics.stage("encode"):
+        graphJSON1 = to_json(fig1)
+        graphJSON2 = to_json(fig2)
+        graphJSON3 = to_json(fig3)
+        graphJSON4 = to_json(fig4)
 
-    return JSONResponse(content={
+    return {
         "graphJSON1": graphJSON1,
         "graphJSON2": graphJSON2,
         "graphJSON3": graphJSON3,
         "graphJSON4": graphJSON4,
-        "trend_stock": trend_stock,
-        "trend_sector": trend_sector,
-        "trend_index": trend_index
-    })
+        "trend_stock": result["trend_stock"],
+        "trend_sector": result["trend_sector"],
+        "trend_index": result["trend_index"],
+        "relative": result.get("relative")
+    }
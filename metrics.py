@@ -0,0 +1,179 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+BAR_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    le = (("le", _number(float(bound))),)
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {bucket_count}")
+                inf = (("le", "+Inf"),)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, inf)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Counter or gauge whose (labels, value) samples are read from a callback at scrape time.
+    """
+
+    def __init__(self, name, help_text, labelnames, collect, kind="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "ta_request_seconds", "End-to-end request latency.", ("path", "status")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ta_stage_seconds", "Time spent in each processing stage of a request.", ("path", "stage")))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "ta_response_bytes", "Response body size.", ("path",), buckets=SIZE_BUCKETS))
+BARS = REGISTRY.register(Histogram(
+    "ta_bars", "Bars processed per request and timeframe.", ("path", "interval"), buckets=BAR_BUCKETS))
+
+
+class RequestTimer:
+    """
+    Per-request stage timings, reported to the histograms and as a Server-Timing header.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages = []
+        self.notes = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.stages.append((stage, seconds))
+        STAGE_SECONDS.observe(seconds, self.path, stage)
+
+    def note(self, name, description):
+        with self._lock:
+            self.notes.append((name, description))
+
+    def server_timing(self):
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+        entries += [f'{name};desc="{description}"' for name, description in self.notes]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_timer = contextvars.ContextVar("request_timer", default=None)
+
+
+def start_request(path):
+    timer = RequestTimer(path)
+    return timer, _current_timer.set(timer)
+
+
+def end_request(token):
+    _current_timer.reset(token)
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as a stage of the current request; a no-op outside a request.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - started)
+
+
+def note(name, description):
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.note(name, description)
+
+
+def observe_bars(interval, count):
+    timer = _current_timer.get()
+    if timer is not None:
+        BARS.observe(count, timer.path, interval)
@@ -0,0 +1,203 @@
+"""
+Market data providers behind datastore.fetch_data.
+
+A provider returns OHLCV frames for [start_date, end_date) with a sorted, unique
+DatetimeIndex and Open/High/Low/Close/Volume columns. Subclasses implement
+fetch, fetch_many or both; each default is written in terms of the other.
+"""
+import os
+import threading
+import time
+
+import pandas as pd
+
+EXCHANGE_TZ = "America/New_York"
+YAHOO_RATE_LIMIT = float(os.environ.get("TA_YAHOO_RATE_LIMIT", "2"))
+# Requests allowed back to back before the rate applies; covers one /plot/ request's concurrent fetches.
+YAHOO_BURST = int(os.environ.get("TA_YAHOO_BURST", "5"))
+YAHOO_TIMEOUT = float(os.environ.get("TA_YAHOO_TIMEOUT", "10"))
+
+
+def normalize_bars(data):
+    """
+    Flatten yfinance output to a single-ticker OHLCV frame with a sorted, unique index.
+    """
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.droplevel(1, axis=1)
+    data = data[~data.index.duplicated(keep="last")]
+    return data.sort_index()
+
+
+def safe_ticker(ticker):
+    """
+    File-system safe name for a ticker, shared by the bar store and replay files.
+    """
+    return ticker.replace("/", "_").replace("^", "_idx_")
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing rate calls per second with bursts of up to burst calls.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Provider:
+    """
+    Base class for market data providers.
+
+    rate_limit caps upstream requests per second across all threads using this
+    provider; None disables limiting. Call self.throttle() before each request.
+    """
+
+    def __init__(self, rate_limit=None, burst=1):
+        self.limiter = RateLimiter(rate_limit, burst) if rate_limit else None
+
+    def throttle(self):
+        if self.limiter is not None:
+            self.limiter.acquire()
+
+    def fetch(self, ticker, start_date, end_date, interval):
+        return self.fetch_many([ticker], start_date, end_date, interval).get(ticker, pd.DataFrame())
+
+    def fetch_many(self, tickers, start_date, end_date, interval):
+        """
+        Bars for several tickers over one range, as {ticker: frame}.
+        """
+        return {ticker: self.fetch(ticker, start_date, end_date, interval) for ticker in tickers}
+
+
+class YahooProvider(Provider):
+    """
+    Market data provider backed by yf.download.
+
+    One HTTP session is kept for the provider's lifetime so connections are
+    reused across requests, and fetch_many downloads a whole ticker list in a
+    single yf.download call.
+    """
+
+    def __init__(self, rate_limit=YAHOO_RATE_LIMIT, timeout=YAHOO_TIMEOUT, burst=YAHOO_BURST):
+        super().__init__(rate_limit, burst)
+        self.timeout = timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                except ImportError:
+                    return None  # yfinance falls back to its own shared session
+                self._session = curl_requests.Session(impersonate="chrome")
+            return self._session
+
+    def _download(self, tickers, start_date, end_date, interval, **kwargs):
+        import yfinance as yf
+
+        self.throttle()
+        return yf.download(
+            tickers, start=start_date, end=end_date, interval=interval, progress=False,
+            timeout=self.timeout, session=self.session(), **kwargs
+        )
+
+    def fetch(self, ticker, start_date, end_date, interval):
+        return normalize_bars(self._download(ticker, start_date, end_date, interval))
+
+    def fetch_many(self, tickers, start_date, end_date, interval):
+        tickers = list(tickers)
+        data = self._download(tickers, start_date, end_date, interval, group_by="ticker")
+        if data is None or data.empty:
+            return {ticker: pd.DataFrame() for ticker in tickers}
+        present = set(data.columns.get_level_values(0))
+        return {
+            ticker: normalize_bars(data[ticker].dropna(how="all")) if ticker in present else pd.DataFrame()
+            for ticker in tickers
+        }
+
+
+class ReplayProvider(Provider):
+    """
+    Offline provider serving bars from files under root.
+
+    Bars for a ticker and interval live in root/<interval>/<ticker>.parquet or
+    .csv (tickers named as in safe_ticker). Each file is read once and sliced
+    per request. Timezone-aware indexes are converted to the exchange timezone
+    so replayed bars match what YahooProvider returns.
+    """
+
+    EXTENSIONS = (".parquet", ".csv")
+
+    def __init__(self, root, tz=EXCHANGE_TZ, rate_limit=None):
+        super().__init__(rate_limit)
+        self.root = root
+        self.tz = tz
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def path(self, ticker, interval, extension=".parquet"):
+        return os.path.join(self.root, interval, safe_ticker(ticker) + extension)
+
+    def _load(self, ticker, interval):
+        for extension in self.EXTENSIONS:
+            path = self.path(ticker, interval, extension)
+            if not os.path.exists(path):
+                continue
+            if extension == ".parquet":
+                data = pd.read_parquet(path)
+            else:
+                data = pd.read_csv(path, index_col=0)
+                # Offsets change across DST, so parse through UTC rather than per row.
+                utc = data.index.astype(str).str.contains(r"[+-]\d\d:\d\d$").any()
+                data.index = pd.to_datetime(data.index, utc=utc)
+            if data.index.tz is not None:
+                data.index = data.index.tz_convert(self.tz)
+            return normalize_bars(data)
+        return pd.DataFrame()
+
+    def frame(self, ticker, interval):
+        key = (ticker, interval)
+        with self._lock:
+            data = self._frames.get(key)
+        if data is None:
+            data = self._load(ticker, interval)
+            with self._lock:
+                data = self._frames.setdefault(key, data)
+        return data
+
+    def fetch(self, ticker, start_date, end_date, interval):
+        self.throttle()
+        data = self.frame(ticker, interval)
+        if data.empty:
+            return data
+        days = pd.Index(data.index.date)
+        return data[(days >= pd.Timestamp(start_date).date()) & (days < pd.Timestamp(end_date).date())]
+
+    def write(self, ticker, interval, data):
+        """
+        Save bars as a replay file, e.g. to record a live fetch for offline use.
+        """
+        path = self.path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.to_parquet(path)
+        with self._lock:
+            self._frames.pop((ticker, interval), None)
+        return path
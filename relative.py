@@ -0,0 +1,156 @@
+"""
+Rolling relative strength, correlation and beta of stocks against a sector and an index.
+
+Closes are aligned on the benchmarks' common timestamps and turned into log
+returns. Every rolling sum over a window is the difference of two cumulative
+sums, so one pass over a (stocks x bars) matrix gives every statistic for
+every stock and bar. Relative strength is the stock's excess performance over
+the window, exp(sum(stock returns) - sum(benchmark returns)) - 1. Correlation
+and beta are of the stock's returns against the benchmark's.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from timeframes import resample_bars, session_bars
+
+RELATIVE_INTERVAL = os.environ.get("TA_RELATIVE_INTERVAL", "5m")
+# Bars per rolling window; 78 five-minute bars make one regular session.
+RELATIVE_WINDOW = int(os.environ.get("TA_RELATIVE_WINDOW", "78"))
+STATISTICS = ("relative_strength", "correlation", "beta")
+
+
+def interval_closes(data_1m, interval=RELATIVE_INTERVAL):
+    """
+    Session-anchored closes of 1-minute bars at the given interval.
+    """
+    if data_1m.empty:
+        return pd.Series(dtype=np.float64)
+    if interval == "1m":
+        return session_bars(data_1m)["Close"]
+    return resample_bars(data_1m, (interval,))[interval]["Close"].dropna()
+
+
+def _window_sums(values, window):
+    """
+    Sums over the trailing window along the last axis, from one cumulative sum.
+    """
+    totals = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(totals)
+    shifted[..., window:] = totals[..., :-window]
+    return totals - shifted
+
+
+def rolling_relative(stock_closes, benchmark_closes, window=RELATIVE_WINDOW, min_periods=None):
+    """
+    Rolling relative strength, correlation and beta of aligned closes against one benchmark.
+
+    stock_closes is a (stocks, bars) array, or one row, and benchmark_closes has
+    one value per bar. NaN closes drop the returns they touch from the window
+    sums. A window needs at least min_periods valid returns (default: window).
+    Returns {statistic: array shaped like stock_closes}.
+    """
+    stocks = np.atleast_2d(np.asarray(stock_closes, dtype=np.float64))
+    benchmark = np.asarray(benchmark_closes, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    results = {name: np.full(stocks.shape, np.nan) for name in STATISTICS}
+    if stocks.shape[1] < 2:
+        return {name: values.reshape(np.shape(stock_closes)) for name, values in results.items()}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.diff(np.log(stocks), axis=1)
+        y = np.broadcast_to(np.diff(np.log(benchmark)), x.shape)
+        valid = np.isfinite(x) & np.isfinite(y)
+        x, y = np.where(valid, x, 0.0), np.where(valid, y, 0.0)
+        # Centering changes no covariance but keeps the running sums of squares small.
+        x_center = x.sum(axis=1, keepdims=True) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+        y_center = y.sum(axis=1, keepdims=True) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+        xc, yc = np.where(valid, x - x_center, 0.0), np.where(valid, y - y_center, 0.0)
+
+        n = _window_sums(valid.astype(np.float64), window)
+        sum_x, sum_y = _window_sums(x, window), _window_sums(y, window)
+        sum_xc, sum_yc = _window_sums(xc, window), _window_sums(yc, window)
+        cov = n * _window_sums(xc * yc, window) - sum_xc * sum_yc
+        var_x = n * _window_sums(xc * xc, window) - sum_xc ** 2
+        var_y = n * _window_sums(yc * yc, window) - sum_yc ** 2
+
+        enough = n >= max(min_periods, 2)
+        statistics = {
+            "relative_strength": np.expm1(sum_x - sum_y),
+            "correlation": cov / np.sqrt(var_x * var_y),
+            "beta": cov / var_y,
+        }
+    for name, values in statistics.items():
+        results[name][:, 1:] = np.where(enough, values, np.nan)
+    return {name: values.reshape(np.shape(stock_closes)) for name, values in results.items()}
+
+
+def align_closes(stock_closes, sector_closes, index_closes):
+    """
+    Stock closes reindexed onto the timestamps the sector and index share.
+
+    stock_closes maps ticker to a close Series. Returns (timestamps, stocks,
+    sector, index) where stocks is a (tickers, bars) array in the mapping's
+    order, with NaN where a stock has no bar.
+    """
+    timestamps = sector_closes.dropna().index.intersection(index_closes.dropna().index).sort_values()
+    stocks = np.full((len(stock_closes), len(timestamps)), np.nan)
+    for row, closes in enumerate(stock_closes.values()):
+        if len(closes):
+            stocks[row] = closes.reindex(timestamps).to_numpy(dtype=np.float64)
+    return (
+        timestamps, stocks,
+        sector_closes.reindex(timestamps).to_numpy(dtype=np.float64),
+        index_closes.reindex(timestamps).to_numpy(dtype=np.float64),
+    )
+
+
+def _latest(values):
+    """
+    Each row's last non-NaN value.
+    """
+    finite = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(finite[:, ::-1], axis=1)
+    latest = values[np.arange(values.shape[0]), last]
+    return np.where(finite.any(axis=1), latest, np.nan)
+
+
+def relative_table(stock_closes, sector_closes, index_closes, window=RELATIVE_WINDOW, min_periods=None):
+    """
+    Latest rolling statistics for many stocks against one shared sector and index, ranked.
+
+    Columns are <statistic>_sector and <statistic>_index for each statistic,
+    plus rs_rank, which ranks by relative strength against the index (1 is strongest).
+    """
+    timestamps, stocks, sector, index = align_closes(stock_closes, sector_closes, index_closes)
+    table = pd.DataFrame(index=pd.Index(list(stock_closes), name="ticker"))
+    for benchmark_name, benchmark in (("sector", sector), ("index", index)):
+        results = rolling_relative(stocks, benchmark, window, min_periods)
+        for name in STATISTICS:
+            table[f"{name}_{benchmark_name}"] = _latest(results[name]) if len(timestamps) else np.nan
+    table["rs_rank"] = table["relative_strength_index"].rank(ascending=False, method="min")
+    return table
+
+
+def relative_summary(stock_closes, sector_closes, index_closes, window=RELATIVE_WINDOW, min_periods=None):
+    """
+    Latest rolling statistics of one stock against its sector and index, JSON-ready.
+
+    A range shorter than the window uses all of its returns as one window.
+    Returns {"sector": {statistic: value}, "index": {...}, "window": bars used,
+    "bars": aligned bars} with None for statistics that could not be computed.
+    """
+    bars = int(sector_closes.dropna().index.intersection(index_closes.dropna().index).size)
+    window = max(min(window, bars - 1), 1)
+    table = relative_table({"stock": stock_closes}, sector_closes, index_closes, window, min_periods)
+    row = table.iloc[0]
+    summary = {
+        benchmark: {
+            name: None if pd.isna(row[f"{name}_{benchmark}"]) else float(row[f"{name}_{benchmark}"])
+            for name in STATISTICS
+        }
+        for benchmark in ("sector", "index")
+    }
+    summary.update({"window": window, "bars": bars})
+    return summary
@@ -0,0 +1,93 @@
+"""
+Matplotlib charts for the command-line scripts.
+
+matplotlib and mplfinance are imported on first use, so the scripts and the
+analysis modules they share start without them. Passing an output path renders
+with the Agg backend and writes a PNG or SVG file instead of opening a window;
+set TA_HEADLESS=1 to force that backend everywhere.
+"""
+import os
+
+IMAGE_FORMATS = ("png", "svg")
+HEADLESS = os.environ.get("TA_HEADLESS", "") not in ("", "0")
+
+
+def pyplot(headless=False):
+    """
+    Import matplotlib.pyplot, switching to the non-interactive Agg backend when headless.
+    """
+    import matplotlib
+
+    if headless or HEADLESS:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def _finish(plt, fig, output, block=True):
+    if output is None:
+        plt.show(block=block)
+        return None
+    fig.savefig(output)
+    plt.close(fig)
+    return output
+
+
+def add_horizontal_lines(ax, levels):
+    """
+    Add horizontal lines at the specified levels on the plot and annotate them.
+    """
+    for level in levels:
+        ax.axhline(y=level, color='yellow', linestyle='--', linewidth=1)
+        ax.text(0.01, level, f'{level:.2f}', va='center', ha='left', color='red', transform=ax.get_yaxis_transform())
+
+
+def plot_level_charts(stock_ticker, frames, significant_levels, valid_levels, trends, output=None, block=False):
+    """
+    Candlestick charts for each timeframe in frames, stacked in one figure.
+
+    The 1m chart shows every significant level and the others the confirmed ones.
+    trends maps each interval to its trend label. Returns the output path, or None
+    when the figure was shown on screen.
+    """
+    plt = pyplot(headless=output is not None)
+    import mplfinance as mpf
+
+    titles = {"1m": "1 Minute", "5m": "5 Minute", "15m": "15 Minute", "1h": "1 Hour"}
+    fig, axes = plt.subplots(len(frames), 1, figsize=(12, 6 * len(frames)))
+    for ax, (interval, data) in zip(axes, frames.items()):
+        mpf.plot(data, type='candle', style='charles', axtitle=f'{stock_ticker} - {titles[interval]} Interval ({trends[interval]})',
+                 ylabel='Price', ax=ax, volume=False, warn_too_much_data=len(data) + 1)
+        add_horizontal_lines(ax, significant_levels if interval == "1m" else valid_levels)
+    fig.tight_layout()
+    return _finish(plt, fig, output, block)
+
+
+def plot_trends(stock_data, sector_data, index_data, stock_ticker, sector_ticker, index_ticker, output=None, block=True):
+    """
+    Close prices of the index, sector and stock in three stacked panels.
+    """
+    plt = pyplot(headless=output is not None)
+    fig = plt.figure(figsize=(14, 10))
+
+    for position, (data, ticker) in enumerate(
+        ((index_data, index_ticker), (sector_data, sector_ticker), (stock_data, stock_ticker)), start=1
+    ):
+        ax = fig.add_subplot(3, 1, position)
+        ax.plot(data['Close'], label=f'{ticker} Close')
+        ax.set_title(f'{ticker} Trend')
+        ax.legend()
+
+    fig.tight_layout()
+    return _finish(plt, fig, output, block)
+
+
+def image_path(output_dir, name, image_format="png"):
+    """
+    Path for a chart image inside output_dir, creating the directory if needed.
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {image_format!r}; expected one of {IMAGE_FORMATS}")
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, f"{name}.{image_format}")
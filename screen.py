@@ -0,0 +1,171 @@
+"""
+Batch screening of a ticker universe: levels, trends and relative strength, no figures.
+
+    python screen.py --tickers AAPL MSFT NVDA --sector XLK --index ^GSPC \
+        --start 2024-07-22 --end 2024-07-25 --workers 8 --sort rs_rank --output screen.csv
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analysis import analyze_and_filter_levels, find_significant_levels
+from datastore import fetch_data, fetch_many
+from relative import RELATIVE_WINDOW, interval_closes, relative_table
+from timeframes import resample_bars
+from trend import determine_trend, determine_trends
+
+FETCH_WORKERS = int(os.environ.get("TA_FETCH_WORKERS", "16"))
+# Tickers per bulk provider request; smaller batches start the analyses sooner.
+FETCH_BATCH = int(os.environ.get("TA_FETCH_BATCH", "20"))
+
+_process_pool = None
+
+
+def get_process_pool(workers=None):
+    """
+    Shared spawn-based process pool; spawn avoids forking a multi-threaded server process.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def screen_ticker(ticker, data_1m, tolerance=0.5, atr_multiple=None):
+    """
+    Levels and trend for one ticker's 1-minute bars, as one table row.
+    """
+    row = {"ticker": ticker, "bars": len(data_1m)}
+    if data_1m.empty:
+        return row
+    frames = resample_bars(data_1m, ("5m", "15m", "1h"))
+    levels = find_significant_levels(data_1m)
+    valid_levels = analyze_and_filter_levels(
+        data_1m, levels, frames["5m"], frames["15m"], frames["1h"],
+        tolerance=tolerance, atr_multiple=atr_multiple
+    )
+    last_close = float(data_1m['Close'].iloc[-1])
+    valid = np.asarray(valid_levels)
+    below, above = valid[valid <= last_close], valid[valid > last_close]
+    row.update({
+        "last_close": last_close,
+        "trend": determine_trend(frames["1h"]),
+        "levels": len(levels),
+        "valid_levels": len(valid_levels),
+        "support": float(below.max()) if below.size else None,
+        "resistance": float(above.min()) if above.size else None,
+        "level_values": [round(level, 4) for level in valid_levels],
+    })
+    return row
+
+
+def _screen_with_closes(ticker, data_1m, tolerance=0.5, atr_multiple=None):
+    return screen_ticker(ticker, data_1m, tolerance, atr_multiple), interval_closes(data_1m)
+
+
+def _closes(data):
+    # BarStore.read returns a column-less frame when nothing is stored for the range.
+    return data['Close'] if 'Close' in data else pd.Series(dtype=np.float64)
+
+
+def screen_universe(tickers, sector_ticker, index_ticker, start_date, end_date,
+                    workers=None, tolerance=0.5, atr_multiple=None, pool=None, relative_window=RELATIVE_WINDOW):
+    """
+    Screen many tickers against one shared sector/index fetch.
+
+    Tickers are downloaded in bulk batches on a thread pool and each ticker's
+    analysis is submitted to a process pool as soon as its batch arrives, so
+    CPU work overlaps with I/O. The workers also return their closes at
+    relative.RELATIVE_INTERVAL. Relative strength, correlation and beta
+    against the sector and index are then computed for the whole universe in
+    one batched pass and ranked. A sector or index with no bars in the range
+    gives "Insufficient data" trends and empty relative columns instead of
+    failing the screen. Returns a DataFrame with one row per ticker.
+    """
+    tickers = list(tickers)
+    pool = pool or get_process_pool(workers)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetch_pool:
+        sector_future = fetch_pool.submit(fetch_data, sector_ticker, start_date, end_date, "1d")
+        index_future = fetch_pool.submit(fetch_data, index_ticker, start_date, end_date, "1d")
+        benchmarks_future = fetch_pool.submit(fetch_many, [sector_ticker, index_ticker], start_date, end_date, "1m")
+        batches = [
+            fetch_pool.submit(fetch_many, tickers[i:i + FETCH_BATCH], start_date, end_date, "1m")
+            for i in range(0, len(tickers), FETCH_BATCH)
+        ]
+        analyses = []
+        for future in as_completed(batches):
+            for ticker, data_1m in future.result().items():
+                analyses.append(pool.submit(_screen_with_closes, ticker, data_1m, tolerance, atr_multiple))
+        trend_sector, trend_index = determine_trends(
+            [_closes(sector_future.result()), _closes(index_future.result())]
+        )
+        benchmarks = benchmarks_future.result()
+        rows, closes = [], {}
+        for analysis in analyses:
+            row, ticker_closes = analysis.result()
+            rows.append(row)
+            closes[row["ticker"]] = ticker_closes
+
+    table = pd.DataFrame(rows).set_index("ticker").reindex(tickers)
+    table["trend_sector"] = trend_sector
+    table["trend_index"] = trend_index
+    relative = relative_table(
+        closes, interval_closes(benchmarks[sector_ticker]), interval_closes(benchmarks[index_ticker]), relative_window
+    )
+    return table.join(relative)
+
+
+def read_tickers(args):
+    tickers = list(args.tickers or [])
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            tickers += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(tickers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a ticker universe for significant levels and trends.")
+    parser.add_argument("--tickers", nargs="*", help="ticker symbols")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--sector", default="XLK")
+    parser.add_argument("--index", default="^GSPC")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--atr-multiple", type=float, default=None)
+    parser.add_argument("--relative-window", type=int, default=RELATIVE_WINDOW,
+                        help="bars per relative strength/correlation/beta window")
+    parser.add_argument("--sort", choices=("ticker", "rs_rank"), default="ticker", help="row order")
+    parser.add_argument("--output", help="write .csv or .json instead of printing")
+    args = parser.parse_args(argv)
+
+    tickers = read_tickers(args)
+    if not tickers:
+        parser.error("no tickers given")
+    table = screen_universe(
+        tickers, args.sector, args.index, args.start, args.end,
+        workers=args.workers, tolerance=args.tolerance, atr_multiple=args.atr_multiple,
+        relative_window=args.relative_window
+    )
+    if args.sort == "rs_rank":
+        table = table.sort_values("rs_rank", na_position="last")
+    if args.output and args.output.endswith(".json"):
+        table.reset_index().to_json(args.output, orient="records", indent=2)
+    elif args.output:
+        table.to_csv(args.output)
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(table.drop(columns=["level_values"], errors="ignore"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
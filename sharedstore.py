@@ -0,0 +1,308 @@
+"""
+Memory-mapped bar store shared by all worker processes on a host.
+
+Each (ticker, interval) lives in a small head file plus one data file per
+generation under SHARED_DIR (tmpfs /dev/shm when available):
+
+    head:  b"TAHD" | padding to 8 | uint64 seq | uint64 generation | uint64 length
+    data:  b"TABS" | padding to 8 | uint64 capacity | tz name (48 bytes) | columns
+
+Columns are time (int64 UTC nanoseconds) then Open, High, Low, Close, Volume
+(float64), each `capacity` rows long. Rows below `length` are never modified
+once published. New bars past the last one are written into spare capacity
+and then published by bumping `length`. Anything else, such as a revised bar
+or a full data file, is written to a new generation file that replaces the
+old one. seq is a seqlock: the writer makes it odd while it changes
+generation/length, and readers retry until they see the same even value on
+both sides of their read. Readers therefore always get a consistent prefix
+and can use the mapped columns as NumPy views without copying or locking.
+Writers serialize on an flock per series.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from datastore import CACHE_DIR, BarStore
+from providers import safe_ticker
+
+SHARED_DIR = os.environ.get(
+    "TA_SHARED_DIR",
+    os.path.join("/dev/shm", "technical_analysis") if os.path.isdir("/dev/shm") else os.path.join(CACHE_DIR, "shared"),
+)
+HEAD_MAGIC = b"TAHD"
+DATA_MAGIC = b"TABS"
+HEAD_SIZE = 32
+DATA_HEADER_SIZE = 64
+TZ_FIELD = 48
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+MIN_CAPACITY = 4096
+
+
+class _Generation:
+    """
+    A mapped data file: capacity rows of time plus the OHLCV columns.
+    """
+
+    def __init__(self, path, writable=False):
+        with open(path, "r+b" if writable else "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        if self.map[:4] != DATA_MAGIC:
+            raise ValueError(f"{path} is not a shared bar file")
+        (self.capacity,) = struct.unpack_from("<Q", self.map, 8)
+        tz = self.map[16:16 + TZ_FIELD].rstrip(b"\0").decode()
+        self.tz = tz or None
+        self.time = np.frombuffer(self.map, dtype="<i8", count=self.capacity, offset=DATA_HEADER_SIZE)
+        self.columns = {
+            name: np.frombuffer(
+                self.map, dtype="<f8", count=self.capacity, offset=DATA_HEADER_SIZE + (i + 1) * self.capacity * 8
+            )
+            for i, name in enumerate(COLUMNS)
+        }
+
+    @staticmethod
+    def create(path, capacity, tz):
+        size = DATA_HEADER_SIZE + (len(COLUMNS) + 1) * capacity * 8
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.truncate(size)
+            f.write(DATA_MAGIC.ljust(8, b"\0") + struct.pack("<Q", capacity) + (tz or "").encode().ljust(TZ_FIELD, b"\0"))
+        os.replace(tmp_path, path)
+        return _Generation(path, writable=True)
+
+
+def _frame_columns(data):
+    """
+    (UTC nanoseconds, {column: float64 array}, tz name) for a bar frame.
+    """
+    index = data.index
+    tz = str(index.tz) if index.tz is not None else None
+    times = (index.tz_convert("UTC").tz_localize(None) if tz else index).as_unit("ns").asi8
+    columns = {
+        name: data[name].to_numpy(dtype=np.float64) if name in data else np.full(len(data), np.nan)
+        for name in COLUMNS
+    }
+    return times, columns, tz
+
+
+class SharedBarStore:
+    """
+    BarStore front end that serves reads from shared memory-mapped columns.
+
+    The Parquet BarStore stays the durable copy and the source of the coverage
+    manifest. Every write goes to both stores. A series missing from shared
+    memory is loaded from Parquet by the first process that reads it, and later
+    reads in any process are zero-copy views of the same pages.
+    """
+
+    def __init__(self, backing=None, root=SHARED_DIR):
+        self.backing = backing or BarStore()
+        self.root = root
+        self._generations = {}
+        self._heads = {}
+        self._lock = threading.Lock()
+        self._held = threading.local()
+
+    def covered_ranges(self, ticker, interval):
+        return self.backing.covered_ranges(ticker, interval)
+
+    def mark_covered(self, ticker, interval, start_date, end_date):
+        self.backing.mark_covered(ticker, interval, start_date, end_date)
+
+    def missing_ranges(self, ticker, interval, start_date, end_date):
+        return self.backing.missing_ranges(ticker, interval, start_date, end_date)
+
+    def _path(self, ticker, interval, suffix):
+        return os.path.join(self.root, safe_ticker(ticker), f"{interval}.{suffix}")
+
+    @contextmanager
+    def fetch_lock(self, ticker, interval):
+        """
+        Exclusive lock on one series across threads and processes; re-entrant within a thread.
+        """
+        held = self._held.__dict__.setdefault("keys", set())
+        key = (ticker, interval)
+        if key in held:
+            yield
+            return
+        path = self._path(ticker, interval, "lock")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _head(self, ticker, interval, create=False):
+        key = (ticker, interval)
+        with self._lock:
+            head = self._heads.get(key)
+        if head is not None:
+            return head
+        path = self._path(ticker, interval, "head")
+        if not os.path.exists(path):
+            if not create:
+                return None
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(HEAD_MAGIC.ljust(HEAD_SIZE, b"\0"))
+            os.replace(tmp_path, path)
+        with open(path, "r+b") as f:
+            head = mmap.mmap(f.fileno(), HEAD_SIZE)
+        with self._lock:
+            return self._heads.setdefault(key, head)
+
+    def _generation(self, ticker, interval, generation, writable=False):
+        key = (ticker, interval, generation, writable)
+        with self._lock:
+            mapped = self._generations.get(key)
+        if mapped is None:
+            mapped = _Generation(self._path(ticker, interval, f"{generation}.data"), writable)
+            with self._lock:
+                # Older generations of this series are unlinked; drop their mappings too.
+                for stale in [k for k in self._generations if k[:2] == key[:2] and k[2] != generation]:
+                    del self._generations[stale]
+                mapped = self._generations.setdefault(key, mapped)
+        return mapped
+
+    def snapshot(self, ticker, interval):
+        """
+        A consistent (generation, length) pair for a series, or None if it is not in shared memory.
+        """
+        head = self._head(ticker, interval)
+        if head is None:
+            return None
+        while True:
+            (seq,) = struct.unpack_from("<Q", head, 8)
+            if seq % 2:
+                time.sleep(0)
+                continue
+            generation, length = struct.unpack_from("<QQ", head, 16)
+            if struct.unpack_from("<Q", head, 8)[0] == seq:
+                return (generation, length) if seq else None
+
+    def _publish(self, head, generation, length):
+        (seq,) = struct.unpack_from("<Q", head, 8)
+        struct.pack_into("<Q", head, 8, seq + 1)
+        struct.pack_into("<QQ", head, 16, generation, length)
+        struct.pack_into("<Q", head, 8, seq + 2)
+
+    def write(self, ticker, interval, data):
+        if data.empty:
+            return
+        self.backing.write(ticker, interval, data)
+        with self.fetch_lock(ticker, interval):
+            if self.snapshot(ticker, interval) is None:
+                self._load(ticker, interval)
+            else:
+                self._write_shared(ticker, interval, data)
+
+    def _write_shared(self, ticker, interval, data):
+        times, columns, tz = _frame_columns(data)
+        head = self._head(ticker, interval, create=True)
+        state = self.snapshot(ticker, interval)
+        if state is not None:
+            generation, length = state
+            current = self._generation(ticker, interval, generation, writable=True)
+            start = int(np.searchsorted(times, current.time[length - 1], side="right")) if length else 0
+            if self._matches(current, length, times[:start], columns, start):
+                if start == len(times):
+                    return
+                if length + len(times) - start <= current.capacity:
+                    end = length + len(times) - start
+                    current.time[length:end] = times[start:]
+                    for name in COLUMNS:
+                        current.columns[name][length:end] = columns[name][start:]
+                    self._publish(head, generation, end)
+                    return
+            existing = self._frame(current, length)
+            merged = pd.concat([existing, pd.DataFrame(columns, index=data.index)])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            times, columns, tz = _frame_columns(merged)
+            generation += 1
+        else:
+            generation = 1
+        self._write_generation(ticker, interval, head, generation, times, columns, tz)
+
+    @staticmethod
+    def _matches(current, length, overlap_times, columns, count):
+        """
+        Whether the first count new rows repeat the stored rows they overlap exactly.
+        """
+        if count == 0:
+            return True
+        stored = np.searchsorted(current.time[:length], overlap_times)
+        if stored.size and (stored[-1] >= length or not np.array_equal(current.time[stored], overlap_times)):
+            return False
+        return all(
+            np.array_equal(current.columns[name][stored], columns[name][:count], equal_nan=True) for name in COLUMNS
+        )
+
+    def _write_generation(self, ticker, interval, head, generation, times, columns, tz):
+        capacity = max(MIN_CAPACITY, 1 << int(len(times) * 2 - 1).bit_length())
+        path = self._path(ticker, interval, f"{generation}.data")
+        mapped = _Generation.create(path, capacity, tz)
+        mapped.time[:len(times)] = times
+        for name in COLUMNS:
+            mapped.columns[name][:len(times)] = columns[name]
+        mapped.map.flush()
+        self._publish(head, generation, len(times))
+        previous = self._path(ticker, interval, f"{generation - 1}.data")
+        if os.path.exists(previous):
+            # Readers that still map the old file keep their pages until they unmap it.
+            os.unlink(previous)
+
+    def _load(self, ticker, interval):
+        """
+        Fill shared memory for a series from the Parquet store; the caller holds the series lock.
+        """
+        if self.snapshot(ticker, interval) is not None:
+            return
+        data = self.backing.read(ticker, interval, "1900-01-01", "2200-01-01")
+        if not data.empty:
+            self._write_shared(ticker, interval, data)
+
+    @staticmethod
+    def _frame(mapped, length, start=0, end=None):
+        end = length if end is None else end
+        index = pd.DatetimeIndex(mapped.time[start:end].view("M8[ns]"), copy=False)
+        if mapped.tz:
+            index = index.tz_localize("UTC").tz_convert(mapped.tz)
+        columns = {name: mapped.columns[name][start:end] for name in COLUMNS}
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def read(self, ticker, interval, start_date, end_date):
+        state = self.snapshot(ticker, interval)
+        if state is None:
+            with self.fetch_lock(ticker, interval):
+                self._load(ticker, interval)
+            state = self.snapshot(ticker, interval)
+            if state is None:
+                return pd.DataFrame()
+        while True:
+            generation, length = state
+            try:
+                mapped = self._generation(ticker, interval, generation)
+                break
+            except FileNotFoundError:
+                # Replaced between reading the head and opening the file; take the new generation.
+                state = self.snapshot(ticker, interval)
+
+        bounds = []
+        for value in (start_date, end_date):
+            timestamp = pd.Timestamp(pd.Timestamp(value).date())
+            if mapped.tz:
+                timestamp = timestamp.tz_localize(mapped.tz).tz_convert("UTC").tz_localize(None)
+            bounds.append(timestamp.as_unit("ns").value)
+        times = mapped.time[:length]
+        start, end = np.searchsorted(times, bounds, side="left")
+        return self._frame(mapped, length, start, end)
@@ -0,0 +1,327 @@
+"""
+Incremental chart state for the live /stream/ endpoint.
+
+LiveAnalysis is primed once from the history behind the initial snapshot and
+then fed only the newest 1-minute bars. Each apply() returns a delta with the
+bars that changed on every timeframe and any significant levels, confirmed
+levels or trends that changed since the previous delta. Work per update is
+proportional to the new bars, not to the history.
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from analysis import average_true_range, levels_touched, sorted_extremes
+from downsample import downsample_ohlc, target_points
+from timeframes import bucket_start, resample_bars, session_bars
+from tracker import LevelTracker
+from trend import TrendTracker
+
+CHART_INTERVALS = ("1m", "5m", "15m", "1h")
+FILTER_INTERVALS = ("5m", "15m", "1h")
+TREND_INTERVAL = "1h"
+BAR_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def _fmax(a, b):
+    return b if a != a else a if b != b else max(a, b)
+
+
+def _fmin(a, b):
+    return b if a != a else a if b != b else min(a, b)
+
+
+def _same_candle(a, b):
+    """
+    Whether two bars draw the same candle: equal OHLC, with NaN equal to NaN.
+    """
+    return a is not None and b is not None and all(x == y or (x != x and y != y) for x, y in zip(a[:4], b[:4]))
+
+
+def _combine(base, bar):
+    """
+    Merge a later bar into an aggregated bucket the way resample_bars reduces it.
+    """
+    if base is None:
+        return bar
+    return (base[0], _fmax(base[1], bar[1]), _fmin(base[2], bar[2]), bar[3], base[4] + bar[4])
+
+
+def _rows(data):
+    columns = [
+        data[column].to_numpy(dtype=np.float64) if column in data else np.zeros(len(data))
+        for column in BAR_COLUMNS
+    ]
+    return zip(data.index, zip(*(column.tolist() for column in columns)))
+
+
+class _SortedValues:
+    """
+    Sorted highs and lows of closed buckets; new values are merged in batches.
+    """
+
+    def __init__(self, values):
+        self._values = np.asarray(values, dtype=np.float64)
+        self._fresh = []
+
+    def add(self, *values):
+        self._fresh.extend(value for value in values if value == value)
+        if len(self._fresh) > max(64, self._values.size // 8):
+            self._values = np.sort(np.concatenate([self._values, self._fresh]))
+            self._fresh = []
+
+    def touched(self, levels, tolerance):
+        touched = levels_touched(levels, self._values, tolerance)
+        if self._fresh:
+            touched |= levels_touched(levels, np.sort(np.asarray(self._fresh)), tolerance)
+        return touched
+
+
+class _Timeframe:
+    """
+    One timeframe's closed-bucket state plus the bucket still being built.
+
+    base aggregates the closed 1-minute bars of the current bucket and open is
+    base combined with the pending (still updating) 1-minute bar. drawn_last and
+    drawn_bar are the key and values of the last candle sent to the client.
+    """
+
+    def __init__(self, interval, history, pending_key, atr_window, track_touches, track_trend):
+        self.interval = interval
+        self.key, self.base, closed = None, None, history
+        if len(history):
+            (self.key, self.base), = _rows(history.iloc[-1:])
+            closed = history.iloc[:-1]
+        self.open = None
+        self.touched = {}
+        self.drawn_last = None
+        self.drawn_bar = None
+        self.extremes = _SortedValues(sorted_extremes(closed)) if track_touches else None
+        self.tail = deque(
+            zip(*(closed[column].to_numpy(dtype=np.float64).tolist() for column in ("High", "Low", "Close"))),
+            maxlen=atr_window + 1,
+        )
+        self.trend = None
+        if track_trend:
+            self.trend = TrendTracker()
+            self.trend.extend(closed["Close"])
+        if self.key is not None and self.key != pending_key:
+            self._close()
+
+    def _close(self):
+        if self.base is not None:
+            _, high, low, close, _ = self.base
+            if self.extremes is not None:
+                self.extremes.add(high, low)
+            self.tail.append((high, low, close))
+            if self.trend is not None:
+                self.trend.update(close)
+        self.base = None
+
+    def fold(self, timestamp, bar):
+        """
+        Add a closed 1-minute bar to its bucket, closing the previous bucket first.
+        """
+        key = bucket_start(timestamp, self.interval)
+        if key != self.key:
+            self._close()
+            self.key = key
+        self.base = _combine(self.base, bar)
+
+    def set_pending(self, timestamp, bar):
+        key = bucket_start(timestamp, self.interval)
+        if key != self.key:
+            self._close()
+            self.key = key
+        self.open = _combine(self.base, bar)
+        if key == self.drawn_last and _same_candle(self.open, self.drawn_bar):
+            # A poll that re-reads the forming bar unchanged has nothing to send.
+            self.touched.pop(key, None)
+        else:
+            self.touched[key] = self.open
+
+    def atr(self, window):
+        bars = list(self.tail) + [self.open[1:4]]
+        return average_true_range({
+            "High": [bar[0] for bar in bars], "Low": [bar[1] for bar in bars], "Close": [bar[2] for bar in bars],
+        }, window)
+
+    def touches(self, levels, tolerance):
+        touched = self.extremes.touched(levels, tolerance)
+        open_values = np.sort(np.asarray([value for value in self.open[1:3] if value == value]))
+        return touched | levels_touched(levels, open_values, tolerance)
+
+    def take_touched(self):
+        touched, self.touched = self.touched, {}
+        return touched
+
+
+class _DailyTrend:
+    """
+    Trend of a daily series whose last bar (today) may still change.
+    """
+
+    def __init__(self, data):
+        closes = data["Close"].dropna() if len(data) else pd.Series(dtype=np.float64)
+        self.tracker = TrendTracker()
+        self.tracker.extend(closes.iloc[:-1])
+        self.pending = (closes.index[-1], float(closes.iloc[-1])) if len(closes) else None
+
+    def update(self, data):
+        closes = data["Close"].dropna() if len(data) else ()
+        for timestamp, close in closes.items():
+            if self.pending is not None and timestamp < self.pending[0]:
+                continue
+            if self.pending is not None and timestamp > self.pending[0]:
+                self.tracker.update(self.pending[1])
+            self.pending = (timestamp, float(close))
+
+    def trend(self):
+        if self.pending is None:
+            return self.tracker.trend()
+        return self.tracker.peek(self.pending[1])
+
+
+class LiveAnalysis:
+    """
+    Levels, confirmed levels and trends kept current as 1-minute bars arrive.
+
+    Only regular-session bars are used. The newest 1-minute bar is treated as
+    still forming: it appears on the charts and in the confirmation and trend
+    checks, but joins significant-level detection only once a later bar closes it.
+    """
+
+    def __init__(self, data_1m, data_sector, data_index, tolerance=0.5, atr_multiple=None, atr_window=14,
+                 prominence=2, cluster_distance_factor=0.5):
+        self.tolerance = tolerance
+        self.atr_multiple = atr_multiple
+        self.atr_window = atr_window
+        data = session_bars(data_1m)
+        if data.empty:
+            raise ValueError("LiveAnalysis needs at least one regular-session bar")
+
+        closed = data.iloc[:-1]
+        self.levels = LevelTracker(prominence, cluster_distance_factor)
+        self.levels.extend(closed)
+        (pending_time, pending_bar), = _rows(data.iloc[-1:])
+
+        self._history = resample_bars(data, CHART_INTERVALS)
+        primed = resample_bars(closed, CHART_INTERVALS)
+        self.frames = {
+            interval: _Timeframe(
+                interval, primed[interval], bucket_start(pending_time, interval), atr_window,
+                track_touches=interval in FILTER_INTERVALS, track_trend=interval == TREND_INTERVAL,
+            )
+            for interval in CHART_INTERVALS
+        }
+        self.sector = _DailyTrend(data_sector)
+        self.index = _DailyTrend(data_index)
+        self.pending_time = None
+        self._set_pending(pending_time, pending_bar)
+        for frame in self.frames.values():
+            frame.drawn_last, frame.drawn_bar = frame.key, frame.open
+            frame.take_touched()
+        self._state = self.state()
+
+    @property
+    def last_time(self):
+        return self.pending_time
+
+    def _set_pending(self, timestamp, bar):
+        self.pending_time, self.pending = timestamp, bar
+        for frame in self.frames.values():
+            frame.set_pending(timestamp, bar)
+
+    def _ingest(self, timestamp, bar):
+        if timestamp < self.pending_time:
+            return
+        if timestamp > self.pending_time:
+            self.levels.update(self.pending[1], self.pending[2])
+            for frame in self.frames.values():
+                frame.fold(self.pending_time, self.pending)
+        self._set_pending(timestamp, bar)
+
+    def significant_levels(self):
+        return self.levels.levels()
+
+    def valid_levels(self, significant_levels=None):
+        levels = np.asarray(self.significant_levels() if significant_levels is None else significant_levels)
+        keep = np.ones(levels.size, dtype=bool)
+        for interval in FILTER_INTERVALS:
+            frame = self.frames[interval]
+            tolerance = self.tolerance
+            if self.atr_multiple is not None:
+                tolerance = self.atr_multiple * frame.atr(self.atr_window)
+            keep &= frame.touches(levels, tolerance)
+        return levels[keep].tolist()
+
+    def state(self):
+        significant = self.significant_levels()
+        return {
+            "significant_levels": significant,
+            "valid_levels": self.valid_levels(significant),
+            "trend_stock": self.frames[TREND_INTERVAL].trend.peek(self.frames[TREND_INTERVAL].open[3]),
+            "trend_sector": self.sector.trend(),
+            "trend_index": self.index.trend(),
+        }
+
+    def snapshot(self, chart_width):
+        """
+        The initial chart state, shaped like main.run_analysis output for figures.build_figures.
+
+        Candles are downsampled to the chart width except the last one per
+        timeframe, which stays a single bucket so later deltas can replace it.
+        """
+        max_points = target_points(chart_width)
+        charts = {}
+        for interval, data in self._history.items():
+            head = downsample_ohlc(data.iloc[:-1], max(max_points - 1, 1))
+            charts[interval] = pd.concat([head, data.iloc[-1:]]) if len(head) else data.iloc[-1:]
+        first_timestamp = self._history["1m"].index[0]
+        self._history = None
+        return {"charts": charts, "first_timestamp": first_timestamp, **self._state}
+
+    def apply(self, data_1m, data_sector=None, data_index=None):
+        """
+        Ingest the newest bars and return the delta since the previous call, or None if nothing changed.
+
+        data_1m may overlap bars already seen; bars older than the forming bar are
+        ignored and a bar with the forming bar's timestamp replaces it. The delta
+        maps "bars" to {interval: {"replace": 0 or 1, "x": [...], "open": [...], ...}},
+        where replace says whether the first bar updates the chart's last candle,
+        and includes each level list or trend only when it changed.
+        """
+        data = session_bars(data_1m) if len(data_1m) else data_1m
+        for timestamp, bar in _rows(data):
+            self._ingest(timestamp, bar)
+        if data_sector is not None:
+            self.sector.update(data_sector)
+        if data_index is not None:
+            self.index.update(data_index)
+
+        delta = {}
+        bars = {}
+        for interval, frame in self.frames.items():
+            touched = frame.take_touched()
+            if not touched:
+                continue
+            keys = sorted(touched)
+            values = [touched[key] for key in keys]
+            bars[interval] = {
+                "replace": int(keys[0] == frame.drawn_last),
+                "x": [key.isoformat() for key in keys],
+                **{
+                    column.lower(): [None if math.isnan(value[i]) else value[i] for value in values]
+                    for i, column in enumerate(BAR_COLUMNS[:4])
+                },
+            }
+            frame.drawn_last, frame.drawn_bar = keys[-1], values[-1]
+        if bars:
+            delta["bars"] = bars
+
+        state = self.state()
+        delta.update({key: value for key, value in state.items() if value != self._state.get(key)})
+        self._state = state
+        return delta or None
@@ -1,202 +1,169 @@
-import yfinance as yf
-import pandas as pd
-import mplfinance as mpf
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks
-
-def find_significant_levels(data, prominence=2, cluster_distance_factor=0.5):
+"""
+Significant levels and trends rendered as candlestick and trend charts.
+
+Without --output-dir the charts for each ticker open on screen one after
+another. With --output-dir every chart is rendered headless in parallel worker
+processes, and a JSON summary of levels and trends is written next to the images:
+
+    python technicalanalysis.py --tickers-file sp500.txt --ranges 2024-07-22:2024-07-25 \
+        --output-dir reports/2024-07-25 --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from analysis import analyze_and_filter_levels, find_significant_levels
+from datastore import fetch_data, fetch_many
+from providers import safe_ticker
+from render import IMAGE_FORMATS, image_path, plot_level_charts, plot_trends
+from screen import FETCH_BATCH, FETCH_WORKERS, read_tickers
+from timeframes import resample_bars
+from trend import determine_trends
+
+def analyze(data_1m):
     """
-    Identify significant levels based on prominent highs and lows and combine clusters into single levels.
-    """
-    highs = data['High']
-    lows = data['Low']
-    price_range = highs.max() - lows.min()
-    adjusted_cluster_distance = price_range * cluster_distance_factor / 100
-
-    # Find prominent peaks and troughs
-    peak_indices, _ = find_peaks(highs, prominence=prominence)
-    trough_indices, _ = find_peaks(-lows, prominence=prominence)
-
-    peak_levels = highs.iloc[peak_indices].values
-    trough_levels = lows.iloc[trough_indices].values
-
-    # Combine levels
-    all_levels = np.sort(np.concatenate([peak_levels, trough_levels]))
-
-    # Cluster and combine levels
-    clusters = []
-    current_cluster = [all_levels[0]]
-
-    for level in all_levels[1:]:
-        if level - current_cluster[-1] <= adjusted_cluster_distance:
-            current_cluster.append(level)
-        else:
-            clusters.append(current_cluster)
-            current_cluster = [level]
-    clusters.append(current_cluster)
-
-    # Use the average of each cluster as the significant level
-    significant_levels = [np.mean(cluster) for cluster in clusters]
-    return significant_levels
-
-def add_horizontal_lines(ax, levels):
-    """
-    Add horizontal lines at the specified levels on the plot and annotate them.
-    """
-    for level in levels:
-        ax.axhline(y=level, color='yellow', linestyle='--', linewidth=1)
-        ax.text(0.01, level, f'{level:.2f}', va='center', ha='left', color='red', transform=ax.get_yaxis_transform())
+    Significant levels, confirmed levels and per-timeframe trends for one ticker's 1-minute bars.
 
-def analyze_and_filter_levels(data_1m, levels_1m, data_5m, data_15m, data_1h):
-    """
-    Analyze the 1-minute places of interest on the 5-minute, 15-minute, and 1-hour charts and filter out those that do not align.
+    Returns (frames, significant_levels, valid_levels, trends) with frames and
+    trends keyed by interval; the coarser frames are resampled from data_1m.
     """
-    valid_levels = []
-    for level in levels_1m:
-        if ((abs(data_5m['High'] - level) < 0.5).any() or (abs(data_5m['Low'] - level) < 0.5).any()) and \
-           ((abs(data_15m['High'] - level) < 0.5).any() or (abs(data_15m['Low'] - level) < 0.5).any()) and \
-           ((abs(data_1h['High'] - level) < 0.5).any() or (abs(data_1h['Low'] - level) < 0.5).any()):
-            valid_levels.append(level)
-    return valid_levels
-
-def fetch_data(ticker, start_date, end_date, interval):
-    return yf.download(ticker, start=start_date, end=end_date, interval=interval)
-
-def determine_trend(data):
-    """
-    Determine the trend based on the 50-period and 200-period moving averages.
-    """
-    short_ma = data['Close'].rolling(window=50).mean()
-    long_ma = data['Close'].rolling(window=200).mean()
-    if short_ma.iloc[-1] > long_ma.iloc[-1]:
-        return "Bullish"
-    else:
-        return "Bearish"
-
-def plot_trends(stock_data, sector_data, index_data, stock_ticker, sector_ticker, index_ticker):
-    plt.figure(figsize=(14, 10))
-
-    plt.subplot(3, 1, 1)
-    plt.plot(index_data['Close'], label=f'{index_ticker} Close')
-    plt.title(f'{index_ticker} Trend')
-    plt.legend()
-
-    plt.subplot(3, 1, 2)
-    plt.plot(sector_data['Close'], label=f'{sector_ticker} Close')
-    plt.title(f'{sector_ticker} Trend')
-    plt.legend()
-
-    plt.subplot(3, 1, 3)
-    plt.plot(stock_data['Close'], label=f'{stock_ticker} Close')
-    plt.title(f'{stock_ticker} Trend')
-    plt.legend()
-
-    plt.tight_layout()
-    plt.show()
-
-def main():
-    # Define the stock symbol and date range
-    stock_ticker = "TSLA"
-    sector_ticker = "XLK"  # Technology Select Sector SPDR Fund
-    index_ticker = "^GSPC"  # S&P 500 Index
-    start_date = "2024-07-22"
-    end_date = "2024-07-25"
-    interval_1m = "1m"
-    interval_5m = "5m"
-    interval_15m = "15m"
-    interval_1h = "1h"
-
-    # Fetch 1-minute data
-    try:
-        data_1m = fetch_data(stock_ticker, start_date, end_date, interval_1m)
-        if data_1m.empty:
-            raise ValueError(f"No data found for {stock_ticker} in the given date range with {interval_1m} interval.")
-    except Exception as e:
-        print(f"Error fetching 1-minute data: {e}")
-        return
-
     # Find significant levels on the 1-minute data
     significant_levels_1m = find_significant_levels(data_1m)
 
-    # Fetch 5-minute data
-    try:
-        data_5m = fetch_data(stock_ticker, start_date, end_date, interval_5m)
-        if data_5m.empty:
-            raise ValueError(f"No data found for {stock_ticker} in the given date range with {interval_5m} interval.")
-    except Exception as e:
-        print(f"Error fetching 5-minute data: {e}")
-        return
-
-    # Fetch 15-minute data
-    try:
-        data_15m = fetch_data(stock_ticker, start_date, end_date, interval_15m)
-        if data_15m.empty:
-            raise ValueError(f"No data found for {stock_ticker} in the given date range with {interval_15m} interval.")
-    except Exception as e:
-        print(f"Error fetching 15-minute data: {e}")
-        return
-
-    # Fetch 1-hour data
-    try:
-        data_1h = fetch_data(stock_ticker, start_date, end_date, interval_1h)
-        if data_1h.empty:
-            raise ValueError(f"No data found for {stock_ticker} in the given date range with {interval_1h} interval.")
-    except Exception as e:
-        print(f"Error fetching 1-hour data: {e}")
-        return
+    # Derive 5-minute, 15-minute and 1-hour bars from the 1-minute data
+    frames = {"1m": data_1m, **resample_bars(data_1m, ("5m", "15m", "1h"))}
 
     # Analyze and filter levels
-    valid_levels = analyze_and_filter_levels(data_1m, significant_levels_1m, data_5m, data_15m, data_1h)
+    valid_levels = analyze_and_filter_levels(data_1m, significant_levels_1m, frames["5m"], frames["15m"], frames["1h"])
 
     # Determine trends for each time frame
-    trend_1m = determine_trend(data_1m)
-    trend_5m = determine_trend(data_5m)
-    trend_15m = determine_trend(data_15m)
-    trend_1h = determine_trend(data_1h)
+    trends = dict(zip(frames, determine_trends([data['Close'] for data in frames.values()])))
+    return frames, significant_levels_1m, valid_levels, trends
 
-    # Print valid significant levels
-    print("Valid Significant Levels (Places of Interest):")
-    for level in valid_levels:
-        print(f"{level:.2f}")
+def render_ticker(stock_ticker, start_date, end_date, data_1m, sector_ticker, sector_1h, index_ticker, index_1h,
+                  output_dir=None, image_format="png"):
+    """
+    Analyze one ticker and draw its level charts and trend comparison; returns a summary row.
 
-    # Plot the candlestick charts with valid significant levels and trends
+    The stock's 1-hour bars for the trend plot are the ones resampled from data_1m.
+    With output_dir the charts are written there headless, otherwise they are shown.
+    """
+    row = {"ticker": stock_ticker, "start": start_date, "end": end_date, "bars": len(data_1m)}
+    if data_1m.empty:
+        row["error"] = f"No data found for {stock_ticker} in the given date range with 1m interval."
+        return row
+
+    frames, significant_levels_1m, valid_levels, trends = analyze(data_1m)
+    row.update({
+        "significant_levels": [round(level, 4) for level in significant_levels_1m],
+        "valid_levels": [round(level, 4) for level in valid_levels],
+        "trends": trends,
+    })
+
+    name = f"{safe_ticker(stock_ticker)}_{start_date}_{end_date}"
+    outputs = {}
+    if output_dir:
+        outputs = {
+            "levels": image_path(output_dir, f"{name}_levels", image_format),
+            "trends": image_path(output_dir, f"{name}_trends", image_format),
+        }
+    plot_level_charts(stock_ticker, frames, significant_levels_1m, valid_levels, trends, output=outputs.get("levels"))
+    plot_trends(frames["1h"], sector_1h, index_1h, stock_ticker, sector_ticker, index_ticker,
+                output=outputs.get("trends"), block=not output_dir)
+    if outputs:
+        row["images"] = outputs
+    return row
+
+def _render_safely(*args, **kwargs):
     try:
-        fig, axes = plt.subplots(4, 1, figsize=(12, 24))
-
-        # 1-minute chart
-        mpf.plot(data_1m, type='candle', style='charles', axtitle=f'{stock_ticker} - 1 Minute Interval ({trend_1m})', ylabel='Price', ax=axes[0], volume=False, warn_too_much_data=len(data_1m)+1)
-        add_horizontal_lines(axes[0], significant_levels_1m)
-
-        # 5-minute chart
-        mpf.plot(data_5m, type='candle', style='charles', axtitle=f'{stock_ticker} - 5 Minute Interval ({trend_5m})', ylabel='Price', ax=axes[1], volume=False, warn_too_much_data=len(data_5m)+1)
-        add_horizontal_lines(axes[1], valid_levels)
-
-        # 15-minute chart
-        mpf.plot(data_15m, type='candle', style='charles', axtitle=f'{stock_ticker} - 15 Minute Interval ({trend_15m})', ylabel='Price', ax=axes[2], volume=False, warn_too_much_data=len(data_15m)+1)
-        add_horizontal_lines(axes[2], valid_levels)
-
-        # 1-hour chart
-        mpf.plot(data_1h, type='candle', style='charles', axtitle=f'{stock_ticker} - 1 Hour Interval ({trend_1h})', ylabel='Price', ax=axes[3], volume=False, warn_too_much_data=len(data_1h)+1)
-        add_horizontal_lines(axes[3], valid_levels)
-
-        plt.tight_layout()
-        plt.show(block=False)  # Ensure that the plot is shown
-        plt.show(block=False)  # Ensure that the plot is shown
+        return render_ticker(*args, **kwargs)
     except Exception as e:
-        print(f"Error plotting data: {e}")
+        stock_ticker, start_date, end_date = args[:3]
+        return {"ticker": stock_ticker, "start": start_date, "end": end_date, "error": f"{type(e).__name__}: {e}"}
 
-    # Fetch data for stock, sector, and index
-    try:
-        stock_data = fetch_data(stock_ticker, start_date, end_date, interval_1h)
-        sector_data = fetch_data(sector_ticker, start_date, end_date, interval_1h)
-        index_data = fetch_data(index_ticker, start_date, end_date, interval_1h)
-    except Exception as e:
-        print(f"Error fetching data for trends: {e}")
-        return
+def render_batch(tickers, ranges, sector_ticker, index_ticker, output_dir, image_format="png", workers=None):
+    """
+    Render every (ticker, date range) pair headless on a spawn process pool.
 
-    # Plot the trends
-    plot_trends(stock_data, sector_data, index_data, stock_ticker, sector_ticker, index_ticker)
+    Each range's sector and index bars are fetched once and shared by all
+    tickers, ticker bars are fetched in bulk batches, and a ticker's charts are
+    submitted for rendering as soon as its batch arrives. Returns the summary
+    rows in (range, ticker) order.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+    with pool, ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetch_pool:
+        renders = []
+        for start_date, end_date in ranges:
+            sector_future = fetch_pool.submit(fetch_data, sector_ticker, start_date, end_date, "1h")
+            index_future = fetch_pool.submit(fetch_data, index_ticker, start_date, end_date, "1h")
+            batches = [
+                fetch_pool.submit(fetch_many, tickers[i:i + FETCH_BATCH], start_date, end_date, "1m")
+                for i in range(0, len(tickers), FETCH_BATCH)
+            ]
+            sector_1h, index_1h = sector_future.result(), index_future.result()
+            for future in as_completed(batches):
+                for stock_ticker, data_1m in future.result().items():
+                    renders.append(pool.submit(
+                        _render_safely, stock_ticker, start_date, end_date, data_1m,
+                        sector_ticker, sector_1h, index_ticker, index_1h, output_dir, image_format,
+                    ))
+        rows = [render.result() for render in renders]
+    order = {(start, end, ticker): i for i, (start, end, ticker) in enumerate(
+        (start, end, ticker) for start, end in ranges for ticker in tickers
+    )}
+    return sorted(rows, key=lambda row: order[(row["start"], row["end"], row["ticker"])])
+
+def parse_range(value):
+    start_date, sep, end_date = value.partition(":")
+    if not sep or not start_date or not end_date:
+        raise argparse.ArgumentTypeError(f"expected START:END, got {value!r}")
+    return start_date, end_date
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Significant levels and trends for one or more tickers.")
+    parser.add_argument("--tickers", nargs="*", help="ticker symbols (default: TSLA)")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--sector", default="XLK", help="sector ticker (default: XLK, Technology Select Sector SPDR Fund)")
+    parser.add_argument("--index", default="^GSPC", help="index ticker (default: ^GSPC, S&P 500 Index)")
+    parser.add_argument("--ranges", nargs="*", type=parse_range, default=[("2024-07-22", "2024-07-25")],
+                        metavar="START:END", help="date ranges, end exclusive")
+    parser.add_argument("--output-dir", help="write the charts and summary.json here instead of showing them")
+    parser.add_argument("--format", default="png", choices=IMAGE_FORMATS)
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    tickers = read_tickers(args) or ["TSLA"]
+
+    if args.output_dir:
+        rows = render_batch(tickers, args.ranges, args.sector, args.index, args.output_dir, args.format, args.workers)
+        summary_path = os.path.join(args.output_dir, "summary.json")
+        with open(summary_path, "w") as f:
+            json.dump(rows, f, indent=2)
+        failed = [row for row in rows if "error" in row]
+        print(f"Rendered {len(rows) - len(failed)} of {len(rows)} charts; summary in {summary_path}")
+        for row in failed:
+            print(f"{row['ticker']} {row['start']}:{row['end']}: {row['error']}")
+        return 1 if failed else 0
+
+    for start_date, end_date in args.ranges:
+        sector_1h = fetch_data(args.sector, start_date, end_date, "1h")
+        index_1h = fetch_data(args.index, start_date, end_date, "1h")
+        for stock_ticker in tickers:
+            data_1m = fetch_data(stock_ticker, start_date, end_date, "1m")
+            row = render_ticker(stock_ticker, start_date, end_date, data_1m, args.sector, sector_1h, args.index, index_1h)
+            if "error" in row:
+                print(f"Error fetching 1-minute data: {row['error']}")
+                continue
+            # Print valid significant levels
+            print(f"{stock_ticker} Valid Significant Levels (Places of Interest):")
+            for level in row["valid_levels"]:
+                print(f"{level:.2f}")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
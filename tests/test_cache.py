@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from cache import ResultCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class SlowCompute:
+    def __init__(self, value="payload", error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def test_concurrent_callers_share_one_computation():
+    async def scenario():
+        cache, compute = ResultCache(), SlowCompute()
+        compute.release = asyncio.Event()
+        callers = [asyncio.create_task(cache.get_or_compute("key", compute, 60)) for _ in range(3)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await asyncio.gather(*callers), compute.calls, cache.stats()
+
+    results, calls, stats = run(scenario())
+    assert results == ["payload"] * 3
+    assert calls == 1
+    assert (stats["misses"], stats["coalesced"]) == (1, 2)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        cache, compute = ResultCache(), SlowCompute()
+        compute.release = asyncio.Event()
+        leader = asyncio.create_task(cache.get_or_compute("key", compute, 60))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("key", compute, 60))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        compute.release.set()
+        value = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return value, compute.calls, cache.get("key")
+
+    value, calls, cached = run(scenario())
+    assert value == "payload"
+    assert calls == 1
+    assert cached == (True, "payload")
+
+
+def test_none_is_shared_but_not_cached():
+    async def scenario():
+        cache, compute = ResultCache(), SlowCompute(value=None)
+        compute.release = asyncio.Event()
+        compute.release.set()
+        first = await cache.get_or_compute("key", compute, 60)
+        second = await cache.get_or_compute("key", compute, 60)
+        return first, second, compute.calls
+
+    assert run(scenario()) == (None, None, 2)
+
+
+def test_failure_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        cache, compute = ResultCache(), SlowCompute(error=ValueError("upstream"))
+        compute.release = asyncio.Event()
+        callers = [asyncio.create_task(cache.get_or_compute("key", compute, 60)) for _ in range(2)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        return results, cache.get("key"), cache._inflight
+
+    results, cached, inflight = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cached == (False, None)
+    assert inflight == {}
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from analysis import analyze_and_filter_levels, find_significant_levels, levels_touched
+from benchmarks.synthetic import synthetic_frames
+from chunked import ChunkedAnalysis, thin_extremes
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_thinned_extremes_touch_the_same_levels(seed):
+    rng = np.random.default_rng(seed)
+    tolerance = rng.uniform(0.01, 2)
+    extremes = np.unique(np.round(rng.normal(250, 10, 2000), 2))
+    thinned = thin_extremes(extremes, tolerance)
+    picks = rng.choice(extremes, 300)
+    levels = np.concatenate([
+        picks, picks + tolerance, picks - tolerance,
+        np.nextafter(picks + tolerance, np.inf), np.nextafter(picks - tolerance, -np.inf),
+        rng.uniform(extremes[0] - 1, extremes[-1] + 1, 300),
+    ])
+    assert np.array_equal(levels_touched(levels, thinned, tolerance), levels_touched(levels, extremes, tolerance))
+    assert thinned.size <= 2 * (extremes[-1] - extremes[0]) / tolerance + 3
+
+
+@pytest.mark.parametrize("params", [{"tolerance": 0.5}, {"atr_multiple": 1.0}])
+def test_chunks_match_the_full_frame(params):
+    frames = synthetic_frames("1mo")
+    data = frames["1m"]
+    analysis = ChunkedAnalysis(**params)
+    days = data.index.normalize()
+    for day in days.unique():
+        analysis.add(data[days == day])
+    levels = find_significant_levels(data)
+    assert analysis.significant_levels() == levels
+    assert analysis.valid_levels() == analyze_and_filter_levels(
+        data, levels, frames["5m"], frames["15m"], frames["1h"], **params
+    )
@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from datastore import BarStore, fetch_data, fetch_many
+from providers import Provider
+
+
+class FakeProvider(Provider):
+    """
+    Serves one bar per weekday at 10:00 and records every upstream request.
+    """
+
+    def __init__(self, empty=()):
+        super().__init__()
+        self.calls = []
+        self.empty = set(empty)
+
+    def fetch(self, ticker, start_date, end_date, interval):
+        self.calls.append((ticker, start_date, end_date))
+        days = [day for day in pd.date_range(start_date, end_date, inclusive="left")
+                if day.dayofweek < 5 and day.date().isoformat() not in self.empty]
+        index = pd.DatetimeIndex([day + pd.Timedelta(hours=10) for day in days]).tz_localize("America/New_York")
+        if index.empty:
+            return pd.DataFrame()
+        values = [float(day.day) for day in days]
+        return pd.DataFrame({"Open": values, "High": values, "Low": values, "Close": values, "Volume": 1.0},
+                            index=index)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path))
+
+
+def test_missing_ranges_skip_covered_days_and_weekends(store):
+    store.mark_covered("AAPL", "1m", "2024-07-10", "2024-07-12")
+    # 2024-07-06/07 and 2024-07-13/14 are weekends.
+    assert store.missing_ranges("AAPL", "1m", "2024-07-06", "2024-07-15") == [
+        (date(2024, 7, 8), date(2024, 7, 10)), (date(2024, 7, 12), date(2024, 7, 13)),
+    ]
+
+
+def test_fetch_fills_only_the_gaps(store):
+    provider = FakeProvider()
+    first = fetch_data("AAPL", "2024-07-08", "2024-07-10", "1m", store, provider)
+    assert provider.calls == [("AAPL", "2024-07-08", "2024-07-10")]
+    assert len(first) == 2
+
+    wider = fetch_data("AAPL", "2024-07-05", "2024-07-12", "1m", store, provider)
+    assert provider.calls[1:] == [("AAPL", "2024-07-05", "2024-07-06"), ("AAPL", "2024-07-10", "2024-07-12")]
+    assert list(wider.index.day) == [5, 8, 9, 10, 11]
+    assert wider.index.is_monotonic_increasing
+
+    again = fetch_data("AAPL", "2024-07-05", "2024-07-12", "1m", store, provider)
+    assert len(provider.calls) == 3
+    pd.testing.assert_frame_equal(again, wider)
+
+
+def test_coverage_is_merged_in_the_manifest(store):
+    provider = FakeProvider()
+    fetch_data("AAPL", "2024-07-08", "2024-07-10", "1m", store, provider)
+    fetch_data("AAPL", "2024-07-10", "2024-07-12", "1m", store, provider)
+    fetch_data("AAPL", "2024-07-15", "2024-07-16", "1m", store, provider)
+    assert store.covered_ranges("AAPL", "1m") == [
+        (date(2024, 7, 8), date(2024, 7, 12)), (date(2024, 7, 15), date(2024, 7, 16)),
+    ]
+
+
+def test_empty_past_gap_is_covered(store):
+    provider = FakeProvider(empty={"2024-07-04"})
+    assert fetch_data("AAPL", "2024-07-04", "2024-07-05", "1m", store, provider).empty
+    assert fetch_data("AAPL", "2024-07-04", "2024-07-05", "1m", store, provider).empty
+    assert len(provider.calls) == 1
+
+
+def test_empty_gap_including_today_is_retried(store):
+    today = date.today()
+    provider = FakeProvider(empty={today.isoformat()})
+    start, end = today.isoformat(), (today + timedelta(days=1)).isoformat()
+    fetch_data("AAPL", start, end, "1m", store, provider)
+    fetch_data("AAPL", start, end, "1m", store, provider)
+    assert len(provider.calls) == (2 if today.weekday() < 5 else 0)
+
+
+def test_fetch_many_fills_each_tickers_gaps(store):
+    provider = FakeProvider()
+    fetch_data("AAPL", "2024-07-08", "2024-07-10", "1m", store, provider)
+    provider.calls.clear()
+    bars = fetch_many(["AAPL", "MSFT", "NVDA"], "2024-07-08", "2024-07-12", "1m", store, provider)
+    assert sorted(provider.calls) == [
+        ("AAPL", "2024-07-10", "2024-07-12"),
+        ("MSFT", "2024-07-08", "2024-07-12"), ("NVDA", "2024-07-08", "2024-07-12"),
+    ]
+    assert {ticker: len(data) for ticker, data in bars.items()} == {"AAPL": 4, "MSFT": 4, "NVDA": 4}
@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks.synthetic import synthetic_bars
+from stream import CHART_INTERVALS, LiveAnalysis
+
+
+@pytest.fixture
+def bars():
+    return synthetic_bars("AAPL", "2024-07-22", "2024-07-25", "1m", seed=1)
+
+
+@pytest.fixture
+def live(bars):
+    daily = synthetic_bars("XLK", "2023-07-01", "2024-07-25", "1d", seed=1)
+    return LiveAnalysis(bars.iloc[:-5], daily, daily)
+
+
+def test_unchanged_poll_sends_nothing(live, bars):
+    assert live.apply(bars.iloc[-6:-5]) is None
+    assert live.apply(bars.iloc[:0]) is None
+
+
+def test_changed_forming_bar_replaces_the_last_candles(live, bars):
+    forming = bars.iloc[-6:-5].copy()
+    forming["High"] += 0.5
+    delta = live.apply(forming)
+    assert sorted(delta["bars"]) == sorted(CHART_INTERVALS)
+    assert all(update["replace"] == 1 for update in delta["bars"].values())
+    assert live.apply(forming) is None
+
+
+def test_new_bar_is_sent(live, bars):
+    delta = live.apply(bars.iloc[-5:-4])
+    assert delta["bars"]["1m"]["x"] == [bars.index[-5].isoformat()]
+    assert delta["bars"]["1m"]["replace"] == 0
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import find_significant_levels
+from tracker import LevelTracker
+
+
+def random_bars(seed, size=500, nan_share=0.0):
+    rng = np.random.default_rng(seed)
+    # Rounding to cents gives the plateaus of real quotes.
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.5, size)), 2)
+    spread = np.round(rng.uniform(0, 0.6, size), 2)
+    high, low = close + spread, close - spread
+    for column in (high, low):
+        column[rng.random(size) < nan_share] = np.nan
+    return pd.DataFrame({"High": high, "Low": low})
+
+
+def tracked_levels(data, splits=(), **params):
+    tracker = LevelTracker(**params)
+    for chunk in np.split(np.arange(len(data)), splits):
+        tracker.extend(data.iloc[chunk])
+    return tracker.levels()
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_batch_on_random_walks(seed):
+    data = random_bars(seed)
+    assert tracked_levels(data) == find_significant_levels(data)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_batch_across_batch_splits(seed):
+    data = random_bars(seed)
+    splits = sorted(np.random.default_rng(seed).choice(len(data), 5, replace=False))
+    assert tracked_levels(data, splits, prominence=1) == find_significant_levels(data, prominence=1)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_batch_with_missing_values(seed):
+    data = random_bars(seed, nan_share=0.05)
+    assert tracked_levels(data) == find_significant_levels(data)
+
+
+def test_nan_blocks_a_peak():
+    data = pd.DataFrame({"High": [1.0, 6.0, np.nan, 9.0, 0.5, 5.0, 0.5, 6.0, 0.5],
+                         "Low": [0.5, 5.0, 4.0, 6.0, 0.5, 5.0, 0.5, 6.0, 0.5]})
+    assert tracked_levels(data) == find_significant_levels(data)
+
+
+def test_empty():
+    assert LevelTracker().levels() == find_significant_levels(pd.DataFrame({"High": [], "Low": []})) == []
+
+
+def test_peak_at_the_prominence_over_a_non_positive_base():
+    # The threshold used to be found one float step at a time, which crawled through every subnormal here.
+    data = pd.DataFrame({"High": [-3.0, 1.0, -3.0, 0.0, 2.0, 0.0], "Low": [-3.0, 1.0, -3.0, 0.0, 2.0, 0.0]})
+    assert tracked_levels(data, prominence=1) == find_significant_levels(data, prominence=1)
+    assert tracked_levels(data, prominence=2) == find_significant_levels(data, prominence=2)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_levels_read_mid_stream(seed):
+    data = random_bars(seed, size=300, nan_share=0.02)
+    tracker = LevelTracker()
+    for end in range(1, len(data) + 1):
+        tracker.update(data["High"].iloc[end - 1], data["Low"].iloc[end - 1])
+        if end % 7 == 0:
+            assert tracker.levels() == find_significant_levels(data.iloc[:end])
+    assert tracker.levels() == find_significant_levels(data)
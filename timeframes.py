@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+SESSION_OPEN = "09:30"
+SESSION_CLOSE = "16:00"
+INTERVAL_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "1h": 60}
+
+
+def session_bars(data_1m):
+    """
+    Keep only regular-session 1-minute bars (9:30-16:00), matching the chart rangebreaks.
+    """
+    data = data_1m.between_time(SESSION_OPEN, SESSION_CLOSE, inclusive="left")
+    return data.dropna(subset=["Close"])
+
+
+def bucket_start(timestamp, interval):
+    """
+    Start of the session-anchored bucket containing timestamp, as labelled by resample_bars.
+    """
+    day_start = timestamp.normalize() + pd.Timedelta(hours=9, minutes=30)
+    step = INTERVAL_MINUTES[interval]
+    minutes = (timestamp - day_start) // pd.Timedelta(minutes=1)
+    return day_start + pd.Timedelta(minutes=minutes // step * step)
+
+
+def resample_bars(data_1m, intervals=("5m", "15m", "1h")):
+    """
+    Build coarser OHLCV frames from 1-minute bars.
+
+    Buckets are anchored at the 9:30 session open of each day, so hourly bars start
+    at 9:30, 10:30, ... 15:30 like the exchange-aligned bars yfinance serves, and no
+    bucket spans two sessions. Each timeframe is reduced with numpy segmented
+    reductions over the sorted bars instead of a groupby.
+    """
+    data = session_bars(data_1m)
+    if data.empty:
+        return {interval: data.copy() for interval in intervals}
+
+    index = data.index
+    day_start = index.normalize() + pd.Timedelta(hours=9, minutes=30)
+    minutes = ((index - day_start) // pd.Timedelta(minutes=1)).to_numpy()
+    day_codes = pd.factorize(day_start)[0].astype(np.int64)
+
+    columns = {name: data[name].to_numpy(dtype=np.float64) for name in ("Open", "High", "Low", "Close")}
+    volume = data["Volume"].to_numpy(dtype=np.float64) if "Volume" in data else None
+
+    frames = {}
+    for interval in intervals:
+        step = INTERVAL_MINUTES[interval]
+        buckets = minutes // step
+        keys = day_codes * (24 * 60) + buckets
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)] - 1
+
+        bars = {
+            "Open": columns["Open"][starts],
+            "High": np.fmax.reduceat(columns["High"], starts),
+            "Low": np.fmin.reduceat(columns["Low"], starts),
+            "Close": columns["Close"][ends],
+        }
+        if volume is not None:
+            bars["Volume"] = np.add.reduceat(volume, starts)
+        bucket_index = day_start[starts] + pd.to_timedelta(buckets[starts] * step, unit="min")
+        frames[interval] = pd.DataFrame(bars, index=pd.DatetimeIndex(bucket_index, name=index.name))
+    return frames
@@ -0,0 +1,248 @@
+import heapq
+import math
+from bisect import bisect_right, insort
+from fractions import Fraction
+
+import numpy as np
+
+
+
+class _PeakTracker:
+    """
+    Incremental equivalent of scipy.signal.find_peaks(x, prominence=p) for an append-only series.
+
+    A local maximum's left base is fixed once the peak is seen, and its right base
+    can only move lower as bars arrive until a strictly higher bar ends the search,
+    so prominence never decreases. A peak is therefore confirmed the first time a
+    bar drops to its exact prominence threshold, and stays confirmed.
+
+    NaN is handled as find_peaks handles it: it compares false both ways, so it is
+    never a peak, it blocks a neighbouring peak, and it ends any base search. This
+    is the same as treating it as +inf that can never be a candidate itself.
+    """
+
+    __slots__ = ("prominence", "_midpoint", "_midpoint_rounds_up", "_count", "_prev", "_run_rose",
+                 "_left_stack", "_pending", "_heap")
+
+    def __init__(self, prominence):
+        self.prominence = prominence
+        below = math.nextafter(float(prominence), -math.inf)
+        self._midpoint = (Fraction(below) + Fraction(float(prominence))) / 2
+        # A difference exactly at the midpoint rounds to even, which may be the prominence itself.
+        self._midpoint_rounds_up = float(self._midpoint) == float(prominence)
+        self._count = 0
+        self._prev = None
+        self._run_rose = False
+        # (value, min since the previous strictly greater bar), values strictly decreasing
+        self._left_stack = []
+        # Candidates still inside their right-base search as [value, threshold, state, index],
+        # values non-increasing
+        self._pending = []
+        # (-threshold, index, candidate) so the highest threshold is checked first
+        self._heap = []
+
+    def _threshold(self, value, left_min):
+        """
+        Largest right-base value that still gives a prominence >= self.prominence, or None.
+
+        find_peaks compares the rounded difference value - base with the
+        prominence. That difference rounds to at least the prominence exactly
+        when its real value reaches the midpoint between the prominence and the
+        float below it, so the threshold is value minus that midpoint, rounded
+        down to a float in exact arithmetic.
+        """
+        if not value - left_min >= self.prominence:
+            return None
+        bound = Fraction(value) - self._midpoint
+        threshold = float(bound)
+        if Fraction(threshold) > bound or (Fraction(threshold) == bound and not self._midpoint_rounds_up):
+            threshold = math.nextafter(threshold, -math.inf)
+        return threshold
+
+    def update(self, value):
+        """
+        Ingest one value and return the peak values confirmed by it.
+        """
+        if math.isnan(value):
+            value = math.inf
+        index = self._count
+        self._count += 1
+        prev = self._prev
+        self._prev = value
+
+        # Left bases: min since the previous strictly greater value.
+        segment_min = value
+        stack = self._left_stack
+        plateau_left_min = stack[-1][1] if stack else None
+        while stack and stack[-1][0] <= value:
+            segment_min = min(segment_min, stack.pop()[1])
+        stack.append((value, segment_min))
+
+        if prev is None:
+            return []
+
+        confirmed = []
+        if value != prev:
+            if value < prev and self._run_rose and prev != math.inf:
+                # The plateau that rose into prev has now fallen: a local maximum.
+                threshold = self._threshold(prev, plateau_left_min)
+                if threshold is not None:
+                    candidate = [prev, threshold, "pending", index]
+                    self._pending.append(candidate)
+                    heapq.heappush(self._heap, (-threshold, index, candidate))
+            self._run_rose = value > prev
+
+        # A strictly higher value ends the right-base search of every lower candidate.
+        pending = self._pending
+        while pending and pending[-1][0] < value:
+            pending.pop()[2] = "dead"
+
+        heap = self._heap
+        while heap and -heap[0][0] >= value:
+            candidate = heapq.heappop(heap)[2]
+            if candidate[2] == "pending":
+                candidate[2] = "confirmed"
+                confirmed.append(candidate[0])
+        if len(heap) > 2 * len(pending) + 64:
+            self._compact()
+        return confirmed
+
+    def _compact(self):
+        """
+        Drop heap entries of candidates that died before reaching their threshold.
+        """
+        self._heap = [(-c[1], c[3], c) for c in self._pending if c[2] == "pending"]
+        heapq.heapify(self._heap)
+
+
+class LevelTracker:
+    """
+    Stateful support/resistance detector for live bar feeds.
+
+    Feed bars with update() or extend(); levels() returns the same result as
+    analysis.find_significant_levels on all bars seen so far. Peaks and troughs
+    are confirmed with O(log n) amortized work per bar. A missing high or low is
+    kept as NaN, exactly as the batch path sees it.
+
+    Confirmed extrema are kept grouped into their clusters. A new extremum only
+    joins, bridges or starts the clusters next to it, and a wider price range
+    only merges neighbouring clusters, so nothing is ever split. There are at
+    most 100 / cluster_distance_factor + 1 clusters, which bounds the merge pass
+    a new high or low triggers. An insert costs a bisect plus a list insert into
+    one cluster. levels() recomputes only the means of clusters that changed
+    since the last call.
+    """
+
+    def __init__(self, prominence=2, cluster_distance_factor=0.5):
+        self.prominence = prominence
+        self.cluster_distance_factor = cluster_distance_factor
+        self._peaks = _PeakTracker(prominence)
+        self._troughs = _PeakTracker(prominence)
+        # Sorted extrema of each cluster, clusters in ascending order; each cluster's
+        # first value (for bisect) and its mean, None while stale.
+        self._clusters = []
+        self._lows = []
+        self._means = []
+        self._distance = math.nan
+        self.max_high = -math.inf
+        self.min_low = math.inf
+        self.bar_count = 0
+
+    def update(self, high, low):
+        """
+        Ingest one bar and return the newly confirmed extrema.
+        """
+        high, low = float(high), float(low)
+        self.bar_count += 1
+        if high > self.max_high or low < self.min_low:
+            self.max_high = max(self.max_high, high)
+            self.min_low = min(self.min_low, low)
+            self._set_distance(self._cluster_distance())
+        new_extrema = self._peaks.update(high) + [-value for value in self._troughs.update(-low)]
+        for level in new_extrema:
+            self._insert(level)
+        return new_extrema
+
+    def extend(self, data):
+        """
+        Ingest a batch of bars from anything with 'High' and 'Low' columns.
+        """
+        new_extrema = []
+        for high, low in zip(np.asarray(data['High'], dtype=np.float64), np.asarray(data['Low'], dtype=np.float64)):
+            new_extrema.extend(self.update(high, low))
+        return new_extrema
+
+    def _cluster_distance(self):
+        price_range = self.max_high - self.min_low
+        if math.isinf(price_range):
+            # An all-NaN side makes the batch range NaN, which merges every level.
+            price_range = math.nan
+        return price_range * self.cluster_distance_factor / 100
+
+    def _set_distance(self, distance):
+        """
+        Regroup the clusters for a new cluster distance.
+        """
+        previous, self._distance = self._distance, distance
+        if distance == previous or (math.isnan(distance) and math.isnan(previous)):
+            return
+        if not distance > previous:
+            # Leaving the NaN distance can split clusters: regroup from single extrema.
+            self._clusters = [[value] for cluster in self._clusters for value in cluster]
+            self._lows = [cluster[0] for cluster in self._clusters]
+            self._means = [None] * len(self._clusters)
+        self._merge_neighbours()
+
+    def _split(self, gap):
+        # The batch path starts a new cluster exactly where np.diff(levels) > distance.
+        return gap > self._distance
+
+    def _merge_neighbours(self):
+        clusters, lows, means = [], [], []
+        for cluster, low, mean in zip(self._clusters, self._lows, self._means):
+            if clusters and not self._split(low - clusters[-1][-1]):
+                clusters[-1].extend(cluster)
+                means[-1] = None
+            else:
+                clusters.append(cluster)
+                lows.append(low)
+                means.append(mean)
+        self._clusters, self._lows, self._means = clusters, lows, means
+
+    def _insert(self, level):
+        clusters, lows, means = self._clusters, self._lows, self._means
+        right = bisect_right(lows, level)
+        left = right - 1
+        if left >= 0 and level <= clusters[left][-1]:
+            insort(clusters[left], level)
+            means[left] = None
+            return
+        join_left = left >= 0 and not self._split(level - clusters[left][-1])
+        join_right = right < len(clusters) and not self._split(clusters[right][0] - level)
+        if join_left:
+            clusters[left].append(level)
+            means[left] = None
+            if join_right:
+                clusters[left].extend(clusters.pop(right))
+                del lows[right], means[right]
+        elif join_right:
+            clusters[right].insert(0, level)
+            lows[right] = level
+            means[right] = None
+        else:
+            clusters.insert(right, [level])
+            lows.insert(right, level)
+            means.insert(right, None)
+
+    @property
+    def extrema(self):
+        return [value for cluster in self._clusters for value in cluster]
+
+    def levels(self):
+        means = self._means
+        for i, mean in enumerate(means):
+            if mean is None:
+                # Same reduction as cluster_levels, so the means match it bit for bit.
+                cluster = self._clusters[i]
+                means[i] = float(np.add.reduceat(np.asarray(cluster, dtype=np.float64), [0])[0] / len(cluster))
+        return list(means)
@@ -0,0 +1,133 @@
+import numpy as np
+
+SHORT_WINDOW = 50
+LONG_WINDOW = 200
+
+BULLISH = "Bullish"
+BEARISH = "Bearish"
+INSUFFICIENT_DATA = "Insufficient data"
+
+
+def _label(short_mean, long_mean):
+    return BULLISH if short_mean > long_mean else BEARISH
+
+
+class TrendTracker:
+    """
+    Running 50/200-period SMA crossover state.
+
+    Closes go into a fixed-size ring buffer with running window sums, so update()
+    and trend() are constant time regardless of how much history has been seen.
+    The sums are recomputed from the buffer once per full window to keep
+    floating-point drift bounded.
+    """
+
+    __slots__ = ("short_window", "long_window", "_buffer", "_head", "_count", "_short_sum", "_long_sum")
+
+    def __init__(self, short_window=SHORT_WINDOW, long_window=LONG_WINDOW):
+        self.short_window = short_window
+        self.long_window = long_window
+        self._buffer = [0.0] * long_window
+        self._head = 0
+        self._count = 0
+        self._short_sum = 0.0
+        self._long_sum = 0.0
+
+    def update(self, close):
+        close = float(close)
+        if close != close:
+            return self.trend()
+        size = self.long_window
+        if self._count >= size:
+            self._long_sum -= self._buffer[self._head]
+        if self._count >= self.short_window:
+            self._short_sum -= self._buffer[(self._head - self.short_window) % size]
+        self._buffer[self._head] = close
+        self._head = (self._head + 1) % size
+        self._count += 1
+        self._short_sum += close
+        self._long_sum += close
+        if self._head == 0:
+            self._resum()
+        return self.trend()
+
+    def extend(self, closes):
+        for close in np.asarray(closes, dtype=np.float64):
+            self.update(close)
+        return self.trend()
+
+    def _resum(self):
+        size = self.long_window
+        filled = min(self._count, size)
+        recent = [self._buffer[(self._head - 1 - i) % size] for i in range(filled)]
+        self._short_sum = float(np.sum(recent[:self.short_window]))
+        self._long_sum = float(np.sum(recent))
+
+    @property
+    def bar_count(self):
+        return self._count
+
+    def means(self):
+        if self._count < self.long_window:
+            return None
+        return self._short_sum / self.short_window, self._long_sum / self.long_window
+
+    def peek(self, close):
+        """
+        The trend update(close) would return, without ingesting close.
+        """
+        close = float(close)
+        if close != close:
+            return self.trend()
+        if self._count + 1 < self.long_window:
+            return INSUFFICIENT_DATA
+        size = self.long_window
+        short_sum = self._short_sum + close
+        long_sum = self._long_sum + close
+        if self._count >= size:
+            long_sum -= self._buffer[self._head]
+        if self._count >= self.short_window:
+            short_sum -= self._buffer[(self._head - self.short_window) % size]
+        return _label(short_sum / self.short_window, long_sum / self.long_window)
+
+    def trend(self):
+        means = self.means()
+        if means is None:
+            return INSUFFICIENT_DATA
+        return _label(*means)
+
+
+def _tail_matrix(series_list, long_window):
+    tails = np.full((len(series_list), long_window), np.nan)
+    lengths = np.zeros(len(series_list), dtype=np.int64)
+    for row, closes in enumerate(series_list):
+        closes = np.asarray(closes, dtype=np.float64)
+        closes = closes[~np.isnan(closes)][-long_window:]
+        lengths[row] = closes.size
+        if closes.size:
+            tails[row, long_window - closes.size:] = closes
+    return tails, lengths
+
+
+def determine_trends(series_list, short_window=SHORT_WINDOW, long_window=LONG_WINDOW):
+    """
+    Final SMA crossover state for many close series in one vectorized pass.
+
+    Only the last long_window closes of each series are read. Series with fewer
+    than long_window closes report INSUFFICIENT_DATA instead of comparing NaNs.
+    """
+    if not len(series_list):
+        return []
+    tails, lengths = _tail_matrix(series_list, long_window)
+    short_means = tails[:, -short_window:].mean(axis=1)
+    long_means = tails.mean(axis=1)
+    labels = np.where(short_means > long_means, BULLISH, BEARISH).astype(object)
+    labels[lengths < long_window] = INSUFFICIENT_DATA
+    return labels.tolist()
+
+
+def determine_trend(data):
+    """
+    Determine the trend based on the 50-period and 200-period moving averages.
+    """
+    return determine_trends([data['Close']])[0]